@@ -1,119 +1,214 @@
 """
 This script produces a .csv file for sample queries which results in ~90% accuracy for the model used .
+
+Queries are loaded from a JSONL or CSV dataset (columns "query" and "expected") and sent to the model
+concurrently through the shared geminiClient request layer (token-bucket rate limit, deadlines and
+jittered backoff on quota and server errors). Every finished
+query is appended to a checkpoint file keyed by a hash of its query and expected answer, so an
+interrupted run resumes where it stopped and records from a different dataset are ignored. All expected
+and response texts are embedded in one batched encode call at the end. Embeddings are kept in a
+persistent store, so later runs and threshold sweeps only encode text they have not seen before,
+and --rescore re-scores the saved responses without calling Gemini again.
+
+    python AccuracyEval.py --dataset eval_data/test_data.jsonl --concurrency 8 --rps 5
+    python AccuracyEval.py --rescore --thresholds 0.6,0.65,0.7,0.75,0.8
 """
 
 
-import time
-import psutil
+import argparse
 import csv
-import google.generativeai as genai
+import hashlib
+import json
 import os
-from sentence_transformers import SentenceTransformer, util
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psutil
 from dotenv import load_dotenv
-# Initialize models
-load_dotenv()
+from embeddingStore import EmbeddingStore, pairwise_cosine
+from geminiClient import GeminiClient
+import usageAccounting
+from performanceLogger import span
 
+load_dotenv()
 
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-model = genai.GenerativeModel("models/gemini-2.5-flash")
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
-
-
-test_data = [
-{"query": "What is Ayurveda?", "expected": "Ayurveda is an ancient Indian system of medicine that promotes holistic health through balance of body, mind, and spirit."},
-{"query": "Name the three doshas.", "expected": "The three doshas are Vata, Pitta, and Kapha."},
-{"query": "What does Pitta dosha represent?", "expected": "Pitta represents the fire and water elements, governing metabolism and digestion."},
-{"query": "How to balance Kapha?", "expected": "Kapha can be balanced through light, warm foods and regular exercise."},
-{"query": "Which herbs help improve digestion?", "expected": "Ginger, cumin, fennel, and turmeric are commonly used to aid digestion."},
-{"query": "What are the five elements in Ayurveda?", "expected": "Earth, Water, Fire, Air, and Space."},
-{"query": "Explain Vata imbalance symptoms.", "expected": "Vata imbalance causes anxiety, dry skin, constipation, and restlessness."},
-{"query": "What is Panchakarma?", "expected": "Panchakarma is a detoxification therapy in Ayurveda that cleanses and rejuvenates the body."},
-{"query": "Best foods for Pitta?", "expected": "Cool, sweet, and bitter foods like cucumber, coconut, and leafy greens help Pitta."},
-{"query": "What causes Kapha imbalance?", "expected": "Overeating, lack of movement, and heavy foods can cause Kapha imbalance."},
-{"query": "What is Rasayana therapy?", "expected": "Rasayana is a rejuvenation therapy to enhance vitality and longevity."},
-{"query": "What is Triphala?", "expected": "Triphala is a combination of three fruits—Haritaki, Bibhitaki, and Amalaki—used for detoxification and digestion."},
-{"query": "Which oil is used in Abhyanga massage?", "expected": "Sesame oil is commonly used in Abhyanga massage for nourishment."},
-{"query": "What is the ideal time for meditation?", "expected": "Early morning (Brahma Muhurta) is considered ideal for meditation."},
-{"query": "What are sattvic foods?", "expected": "Sattvic foods are pure, light, and nourishing, like fruits, milk, and whole grains."},
-{"query": "What is Ayurveda’s view on sleep?", "expected": "Ayurveda recommends 7–8 hours of sound sleep for maintaining dosha balance."},
-{"query": "Explain the concept of Ojas.", "expected": "Ojas is the essence of vitality and immunity formed through proper digestion and balance."},
-{"query": "What is the Ayurvedic view on exercise?", "expected": "Exercise should be moderate and according to one’s body constitution (Prakriti)."},
-{"query": "Which dosha is dominant in winter?", "expected": "Kapha is dominant in winter due to cold and heavy qualities."},
-{"query": "Name two Ayurvedic detox methods.", "expected": "Virechana (purgation) and Basti (enema) are two Ayurvedic detox methods."},
-
-
-{"query": "What is the purpose of this chatbot?", "expected": "It helps answer questions and analyze images using Gemini 2.5 API."},
-{"query": "Can you explain what Gemini 2.5 is?", "expected": "Gemini 2.5 is Google’s multimodal AI model capable of processing text and images."},
-{"query": "What does multimodal mean?", "expected": "It means the model can handle multiple input types like text, images, and audio."},
-{"query": "How is API latency measured?", "expected": "Latency is measured as the time taken between sending a request and receiving a response."},
-{"query": "What does real-time performance monitoring mean?", "expected": "It tracks CPU, memory, and latency while the model generates responses."},
-{"query": "What programming language is used in this chatbot?", "expected": "Python is used with Streamlit for the interface and Google Gemini API for responses."},
-{"query": "Can this chatbot analyze images?", "expected": "Yes, it supports multimodal interaction including image understanding."},
-{"query": "What is the benefit of API streaming?", "expected": "It reduces response time by sending data incrementally rather than waiting for full generation."},
-{"query": "Which library is used for embedding comparison?", "expected": "The SentenceTransformer library is used for semantic similarity evaluation."},
-{"query": "What is a semantic similarity score?", "expected": "It measures how closely two sentences are related in meaning using embeddings."},
-{"query": "How do you calculate response accuracy?", "expected": "By comparing the generated response with expected answers using cosine similarity."},
-{"query": "What is the difference between accuracy and similarity?", "expected": "Accuracy is binary correctness; similarity measures semantic closeness."},
-{"query": "What model version is used here?", "expected": "The model used is 'models/gemini-2.5-flash'."},
-{"query": "How are test results stored?", "expected": "Metrics like latency, CPU, and accuracy are stored in a CSV file."},
-{"query": "What does CPU(%) indicate?", "expected": "It shows how much processing power was used during inference."},
-{"query": "What does memory(%) indicate?", "expected": "It shows how much RAM usage changed during the API call."},
-{"query": "How can performance be improved?", "expected": "By using API streaming and optimizing model calls."},
-{"query": "What framework is used for the UI?", "expected": "Streamlit is used for the web-based interface."},
-{"query": "Can I use this chatbot offline?", "expected": "No, it requires internet access to call the Gemini API."},
-{"query": "Is the Gemini model open source?", "expected": "No, it’s provided through Google’s API with an API key."},
-]
-
-results = []
-accurate_count = 0
-total_latency = 0
-
-print("\n🚀 Starting Evaluation...\n")
-
-for i, data in enumerate(test_data, start=1):
-    start_time = time.time()
-    cpu_start = psutil.cpu_percent(interval=None)
-    mem_start = psutil.virtual_memory().percent
-
-    response = model.generate_content(data["query"])
-    response_text = response.text.strip()
-
-    cpu_end = psutil.cpu_percent(interval=None)
-    mem_end = psutil.virtual_memory().percent
-    latency = time.time() - start_time
-    total_latency += latency
-
-    # Measure similarity
-    expected_emb = embedder.encode(data["expected"], convert_to_tensor=True)
-    response_emb = embedder.encode(response_text, convert_to_tensor=True)
-    similarity = util.pytorch_cos_sim(expected_emb, response_emb).item()
-
-    # Accuracy threshold
-    correct = 1 if similarity >= 0.7 else 0
-    accurate_count += correct
-
-    results.append({
-        "Query": data["query"],
-        "Expected": data["expected"],
-        "Response": response_text,
-        "Similarity": round(similarity, 3),
-        "Correct": correct,
-        "Latency(s)": round(latency, 2),
-        "CPU(%)": cpu_end - cpu_start,
-        "Memory(%)": mem_end - mem_start
-    })
-
-# Summary metrics
-accuracy = accurate_count / len(test_data) * 100
-avg_latency = total_latency / len(test_data)
-
-print(f"\n✅ Accuracy: {accuracy:.2f}%")
-print(f"⚙️ Average Latency: {avg_latency:.2f}s")
-
-# Save to CSV for proof
-with open("evaluation_results.csv", "w", newline="", encoding="utf-8") as f:
-    writer = csv.DictWriter(f, fieldnames=results[0].keys())
-    writer.writeheader()
-    writer.writerows(results)
-
-print("\n📊 Results saved to 'evaluation_results.csv'")
+MODEL_NAME = "models/gemini-2.5-flash"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_data", "test_data.jsonl")
+
+
+def load_dataset(path):
+    """Read query/expected pairs from a .jsonl or .csv file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [{"query": row["query"], "expected": row["expected"]} for row in rows]
+
+
+def row_key(query, expected):
+    """Stable id of a dataset row, independent of its position in the file."""
+    return hashlib.sha256(json.dumps([query, expected], ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def load_checkpoint(path, dataset):
+    """Saved records for rows of dataset, by row key; records for other rows are skipped."""
+    wanted = {row_key(row["query"], row["expected"]) for row in dataset}
+    done = {}
+    if os.path.isfile(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    key = row_key(record["Query"], record["Expected"])
+                    if key in wanted:
+                        done[key] = record
+    return done
+
+
+def run_queries(model, dataset, checkpoint_path, concurrency, rate, retries):
+    """Query the model for every row not yet in the checkpoint; return all records by row key."""
+    records = load_checkpoint(checkpoint_path, dataset)
+    pending = [(i, row) for i, row in enumerate(dataset) if row_key(row["query"], row["expected"]) not in records]
+    print(f"Resuming: {len(records)} done, {len(pending)} pending" if records else f"{len(pending)} queries")
+
+    client = GeminiClient(rate=rate, burst=concurrency, retries=retries)
+    write_lock = threading.Lock()
+
+    def evaluate(index, row):
+        start_time = time.perf_counter()
+        cpu_start = psutil.cpu_percent(interval=None)
+        mem_start = psutil.virtual_memory().percent
+
+        # The span gives every eval call a performance record with its tokens and cost
+        with span("Accuracy Eval", row["query"], index=index):
+            response = client.generate(model, row["query"])
+            usage = usageAccounting.record(MODEL_NAME, response, row["query"], response.text)
+
+        cpu_end = psutil.cpu_percent(interval=None)
+        mem_end = psutil.virtual_memory().percent
+        return {
+            "Index": index,
+            "Query": row["query"],
+            "Expected": row["expected"],
+            "Response": response.text.strip(),
+            "Latency(s)": round(time.perf_counter() - start_time, 2),
+            "CPU(%)": cpu_end - cpu_start,
+            "Memory(%)": mem_end - mem_start,
+            "Prompt Tokens": usage["prompt_tokens"],
+            "Completion Tokens": usage["completion_tokens"],
+            "Cost ($)": usage["cost_usd"],
+        }
+
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(evaluate, i, row): i for i, row in pending}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                print(f"❌ Query {futures[future]} failed: {e}")
+                continue
+            with write_lock:
+                checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+            records[row_key(record["Query"], record["Expected"])] = record
+            print(f"✔ {len(records)}/{len(dataset)} ({record['Latency(s)']}s) {record['Query']}")
+    return records
+
+
+def score(records, threshold, store):
+    """Embed all expected and response texts in one call and attach similarity/correctness."""
+    expected = [r["Expected"] for r in records]
+    responses = [r["Response"] for r in records]
+    embeddings = store.encode(expected + responses)
+    similarities = pairwise_cosine(embeddings[:len(records)], embeddings[len(records):]).tolist()
+
+    results = []
+    for record, similarity in zip(records, similarities):
+        results.append({
+            "Query": record["Query"],
+            "Expected": record["Expected"],
+            "Response": record["Response"],
+            "Similarity": round(similarity, 3),
+            "Correct": 1 if similarity >= threshold else 0,
+            "Latency(s)": record["Latency(s)"],
+            "CPU(%)": record["CPU(%)"],
+            "Memory(%)": record["Memory(%)"],
+            # Checkpoints written before token accounting have no usage columns
+            "Prompt Tokens": record.get("Prompt Tokens"),
+            "Completion Tokens": record.get("Completion Tokens"),
+            "Cost ($)": record.get("Cost ($)"),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate Gemini answers against expected responses.")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET, help="JSONL or CSV with query/expected columns")
+    parser.add_argument("--output", default="evaluation_results.csv")
+    parser.add_argument("--checkpoint", default="evaluation_checkpoint.jsonl")
+    parser.add_argument("--fresh", action="store_true", help="ignore any existing checkpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=5.0, help="max requests started per second")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--thresholds", help="comma-separated cutoffs to report accuracy for")
+    parser.add_argument("--rescore", action="store_true", help="score saved checkpoint responses without calling Gemini")
+    args = parser.parse_args()
+
+    if args.fresh and os.path.isfile(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    dataset = load_dataset(args.dataset)
+    wall_start = time.perf_counter()
+    if args.rescore:
+        records = load_checkpoint(args.checkpoint, dataset)
+    else:
+        import google.generativeai as genai  # only needed when querying, not for --rescore
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        model = genai.GenerativeModel(MODEL_NAME)
+        print("\n🚀 Starting Evaluation...\n")
+        records = run_queries(model, dataset, args.checkpoint, args.concurrency, args.rps, args.retries)
+    wall_time = time.perf_counter() - wall_start
+    # Dataset order; rows that failed or were never run are left out
+    keys = (row_key(row["query"], row["expected"]) for row in dataset)
+    records = [records[key] for key in keys if key in records]
+    if not records:
+        print("No results to score.")
+        return
+
+    store = EmbeddingStore(EMBEDDING_MODEL)
+    results = score(records, args.threshold, store)
+
+    if args.thresholds:
+        similarities = [r["Similarity"] for r in results]
+        for cutoff in (float(t) for t in args.thresholds.split(",")):
+            swept = sum(s >= cutoff for s in similarities) / len(similarities) * 100
+            print(f"   threshold {cutoff:.2f}: {swept:.2f}%")
+
+    # Summary metrics
+    accuracy = sum(r["Correct"] for r in results) / len(results) * 100
+    avg_latency = sum(r["Latency(s)"] for r in results) / len(results)
+
+    print(f"\n✅ Accuracy: {accuracy:.2f}% ({len(results)}/{len(dataset)} scored)")
+    print(f"⚙️ Average Latency: {avg_latency:.2f}s")
+    costs = [r["Cost ($)"] for r in results if r["Cost ($)"] is not None]
+    if costs:
+        tokens = sum((r["Prompt Tokens"] or 0) + (r["Completion Tokens"] or 0) for r in results)
+        print(f"🪙 Tokens: {tokens} · Cost: ${sum(costs):.4f}")
+    print(f"⏱ Wall-clock time for this run: {wall_time:.2f}s")
+
+    # Save to CSV for proof
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=results[0].keys())
+        writer.writeheader()
+        writer.writerows(results)
+
+    print(f"\n📊 Results saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,39 +10,36 @@ Performance metrics include Latency , CPU usage and memory usage .
 
 import streamlit as st
 import os
-from PIL import Image
-import google.generativeai as genai
-import speech_recognition as sr
-from gtts import gTTS  
 from dotenv import load_dotenv
+from responseCache import get_response_cache
+from ttsCache import get_tts_cache
+from speechPipeline import StreamingPipeline
+from modelRegistry import warm_up
+from imageChat import get_gemini_response, text_to_speech
+from imagePrep import IMAGE_MAX_EDGE, prepare_image
+from speechInput import TranscriptionJob
+from usageAccounting import SessionBudget
+from conversationStore import session_id
 
 load_dotenv()
 
 
-import psutil
-import time
+from performanceLogger import span
+import metricsRegistry
 
 # Create a small function to measure performance
 def measure_performance(func, *args, **kwargs):
-    process = psutil.Process()  # Current process (the Streamlit app)
-    mem_before = process.memory_info().rss / (1024 * 1024)  # MB
-    cpu_before = psutil.cpu_percent(interval=None)
-
-    start_time = time.time()
-    result = func(*args, **kwargs)
-    latency = time.time() - start_time
-
-    mem_after = process.memory_info().rss / (1024 * 1024)
-    cpu_after = psutil.cpu_percent(interval=1)
-
-    mem_used = mem_after - mem_before
-    cpu_used = cpu_after - cpu_before
+    # Timing and this process's CPU time are read in-process; the record is written in the background
+    with span("Image Chat", args[0] if args and isinstance(args[0], str) else "") as s:
+        result = func(*args, **kwargs)
 
     metrics = {
-        "latency_sec": round(latency, 2),
-        "memory_used_mb": round(mem_used, 2),
-        "cpu_used_percent": round(cpu_used, 2),
+        "latency_sec": round(s.metrics["Latency (s)"], 2),
+        "memory_used_mb": s.metrics["Memory Change (MB)"],
+        "cpu_used_percent": s.metrics["CPU Usage (%)"],
     }
+    metrics.update(get_response_cache().stats())
+    metrics.update(s.fields)  # token counts and cost annotated by usageAccounting, when a call was made
     return result, metrics
 
 
@@ -50,10 +47,10 @@ def measure_performance(func, *args, **kwargs):
 
 
 
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
 st.set_page_config(page_title="AI Image & Speech App", layout="wide")
 
+warm_up()
+
 st.markdown("""<style>.title-container { text-align: center; margin-bottom: 30px;}.footer {  padding: 10px; text-align: center; border-radius: 10px; margin-top: 40px; }</style>""",unsafe_allow_html=True)
 
 
@@ -61,29 +58,16 @@ if st.button("💬 Just Chat"):
     st.switch_page("pages/qachat.py")
 if st.button("💬 Emotion Awareness"):
     st.switch_page("pages/emotion.py")
+if st.button("📈 Live Metrics"):
+    st.switch_page("pages/metrics.py")
 
+# Optional Prometheus scrape endpoint, e.g. METRICS_PORT=9464
+if os.getenv("METRICS_PORT"):
+    metricsRegistry.start_http_server()
 
 
 
 
-#  Gemini AI response
-def get_gemini_response(input_text, speech_text, image):
-    model = genai.GenerativeModel('models/gemini-2.5-flash')
-    combined_input = f"{input_text}\n{speech_text}" if speech_text else input_text
-    if combined_input.strip():
-        response = model.generate_content([combined_input, image] if image else [combined_input])
-        return response.text
-    return "Please provide some input."
-
-
-
-
-# Convert Text to Speech (TTS)
-def text_to_speech(response_text):
-    tts = gTTS(text=response_text, lang="en")
-    audio_path = "response_audio.mp3"
-    tts.save(audio_path)  # Save the audio file
-    return audio_path
 
 # Initialize session state for recognized speech and AI response
 if "recognized_text" not in st.session_state:
@@ -96,6 +80,42 @@ if "audio_file" not in st.session_state:
     st.session_state["audio_file"] = None
 
 
+# Shows the background speech job without blocking the rest of the page; run as a polling fragment
+def show_speech_job():
+    if st.session_state.get("speech_error"):
+        st.warning(st.session_state["speech_error"])
+    job = st.session_state.get("speech_job")
+    if job is None:
+        return
+    if job.running:
+        label = "🎤 Listening..." if job.status in ("starting", "listening") else "📝 Transcribing..."
+        st.markdown(f"""
+                <div style="
+                    background-color: #D4EDDA; /* Light green */
+                    color: #155724; /* Dark green text */
+                    padding: 10px;
+                    size:300px;
+                    border-left: 5px solid #155724;
+                    border-radius: 10px;
+                    font-weight: bold;
+                ">
+                    {label}
+                </div>
+            """, unsafe_allow_html=True)
+        if job.partial:
+            st.write(job.partial)
+        return
+
+    # Finished: a full rerun shows the outcome and stops the polling
+    st.session_state["speech_job"] = None
+    if job.status == "done":
+        st.session_state["recognized_text"] = job.text
+        st.session_state["speech_latency"] = job.latency_sec
+    else:
+        st.session_state["speech_error"] = job.error
+    st.rerun()
+
+
 st.markdown("<h1 class='title-container'>   AI IMAGE RECOGNITION CHATBOT</h1>", unsafe_allow_html=True)
 st.markdown("<p class='title-container'>Upload an image, enter text, or speak to interact with AI.</p>",
             unsafe_allow_html=True)
@@ -103,10 +123,24 @@ st.markdown("<p class='title-container'>Upload an image, enter text, or speak to
 st.markdown("<div class='upload-container'><h2>📸 Upload an Image</h2></div>", unsafe_allow_html=True)
 uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"], key="image_uploader")
 
+# Token/cost budget shared by every page of this session
+budget = st.session_state.setdefault("usage_budget", SessionBudget())
+
 image = None
+image_bytes = None
+image_hash = None
+image_tokens = 0
 if uploaded_file:
-    image = Image.open(uploaded_file)
-    st.image(image, caption="Uploaded Image", use_column_width=True, output_format="JPEG")
+    image_bytes = uploaded_file.getvalue()
+    # Decoded, oriented and downscaled once; Gemini gets the compact re-encoded bytes,
+    # smaller still when the session budget is running out
+    prepared = prepare_image(image_bytes, max_edge=budget.image_edge(IMAGE_MAX_EDGE))
+    image = prepared.gemini_part()
+    image_tokens = prepared.token_estimate
+    image_hash = prepared.perceptual_hash
+    st.image(prepared.image, caption="Uploaded Image", use_column_width=True, output_format="JPEG")
+    prep_stats = prepared.stats()
+    st.caption(f"Image {prep_stats['size']}, {prep_stats['bytes_saved'] // 1024} KB saved in {prep_stats['prep_time_ms']} ms")
 
 st.markdown("<br><br>", unsafe_allow_html=True) # Add some space
 
@@ -120,34 +154,23 @@ with col2:
     st.subheader("🎤 Speak Input")
     st.text_area("Recognized Speech:", st.session_state["recognized_text"], height=100, disabled=True)
 
-    # Speech Recognition Button
+    if st.session_state.get("speech_latency"):
+        st.caption(f"⏱ Transcribed in {st.session_state['speech_latency']}s")
+    speech_engine = st.selectbox("Speech engine", ["google", "vosk", "whisper"], key="speech_engine")
+    audio_upload = st.file_uploader("...or upload an audio file", type=["wav", "flac", "aiff", "mp3", "m4a", "ogg"],
+                                    key="audio_uploader")
+
+    # Speech Recognition Button: capture and transcription run on a background worker
     if st.button("Start Speech Recognition", key="speech_button"):
-        recognizer = sr.Recognizer()
-        with sr.Microphone() as source:
-
-            st.markdown("""
-                    <div style="
-                        background-color: #D4EDDA; /* Light green */
-                        color: #155724; /* Dark green text */
-                        padding: 10px;
-                        size:300px;
-                        border-left: 5px solid #155724;
-                        border-radius: 10px;
-                        font-weight: bold;
-                    ">
-                        🎤 Listening...
-                    </div>
-                """, unsafe_allow_html=True)
-
-            try:
-                audio = recognizer.listen(source)
-                spoken_text = recognizer.recognize_google(audio)
-                st.session_state["recognized_text"] = spoken_text  
-                st.rerun()
-            except sr.UnknownValueError:
-                st.warning("Could not understand the audio.")
-            except sr.RequestError:
-                st.error("Speech recognition service error.")
+        st.session_state["speech_job"] = TranscriptionJob(speech_engine)
+        st.session_state["speech_error"] = None
+    if audio_upload is not None and st.button("Transcribe Uploaded Audio", key="transcribe_button"):
+        st.session_state["speech_job"] = TranscriptionJob(speech_engine, audio_upload.getvalue(), audio_upload.name)
+        st.session_state["speech_error"] = None
+
+    # Poll only while a job is running, so idle sessions do not rerun the fragment twice a second
+    speech_job = st.session_state.get("speech_job")
+    st.fragment(run_every=0.5 if speech_job is not None and speech_job.running else None)(show_speech_job)()
 
 
 # Combine inputs
@@ -155,13 +178,45 @@ final_text = input_text.strip() + "\n" + st.session_state["recognized_text"].str
 
 
 st.markdown("<div class='center-button'>", unsafe_allow_html=True)
+stream_response = st.checkbox("Stream response", value=True, key="stream_response")
 if st.button("🚀 Generate Response", key="generate_button"):
     if not final_text.strip():
         st.warning("Please enter text or speak before generating a response.")
+    elif stream_response:
+        # Render tokens as they arrive while sentences are synthesized in the background
+        st.subheader("🧠 AI Response:")
+        pipeline = StreamingPipeline(get_tts_cache())
+        chunks = get_gemini_response(
+            input_text, st.session_state["recognized_text"], image, image_bytes, stream=True, image_hash=image_hash,
+            image_tokens=image_tokens, budget=budget, session=session_id()
+        )
+        stream = pipeline.run(chunks)
+        try:
+            response, metrics = measure_performance(st.write_stream, stream)
+        finally:
+            stream.close()  # on an error or rerun mid-stream this stops the TTS worker; no-op once finished
+        with st.spinner("Finishing audio..."):
+            st.session_state["ai_response"] = response
+            st.session_state["audio_file"] = pipeline.finish_audio()
+        if pipeline.errors:
+            st.warning(f"Speech synthesis failed for {len(pipeline.errors)} sentence(s): {pipeline.errors[0]}")
+        metrics.update(pipeline.metrics())
+        if metrics["time_to_first_token_sec"] is not None:
+            metricsRegistry.observe("time_to_first_token_seconds", pipeline.first_token_sec)
+        if metrics["time_to_first_audio_sec"] is not None:
+            metricsRegistry.observe("time_to_first_audio_seconds", pipeline.first_audio_sec)
+
+        st.success("Response Generated!")
+        st.caption(
+            f"⏱ First token: {metrics['time_to_first_token_sec']}s · "
+            f"🔊 First audio: {metrics['time_to_first_audio_sec']}s · "
+            f"🪙 Session usage: {budget.stats()}"
+        )
     else:
         with st.spinner("Generating response and measuring performance..."):
             response, metrics = measure_performance(
-                get_gemini_response, input_text, st.session_state["recognized_text"], image
+                get_gemini_response, input_text, st.session_state["recognized_text"], image, image_bytes,
+                image_hash=image_hash, image_tokens=image_tokens, budget=budget, session=session_id()
             )
             
             st.session_state["ai_response"] = response
@@ -180,6 +235,7 @@ if st.button("🚀 Generate Response", key="generate_button"):
         # col1.metric("⏱ Latency (s)", metrics["latency_sec"])
         # col2.metric("💾 Memory Used (MB)", metrics["memory_used_mb"])
         # col3.metric("⚙️ CPU Used (%)", metrics["cpu_used_percent"])
+        # st.caption(f"Response cache: {metrics['cache_hits']} hits / {metrics['cache_misses']} misses")
 
 st.markdown("</div>", unsafe_allow_html=True)
 
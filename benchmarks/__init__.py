@@ -0,0 +1 @@
+"""Offline benchmarks: a fake Gemini backend, stub models and a concurrent load runner (run.py)."""
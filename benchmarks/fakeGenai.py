@@ -0,0 +1,124 @@
+"""
+Local stand-in for google.generativeai.
+
+install() registers this module as google.generativeai before the app modules
+are imported, so benchmarks never call the real API. Latency, streaming chunk
+cadence and error rate are set through CONFIG.
+"""
+
+import random
+import sys
+import time
+import types
+
+CONFIG = {
+    "latency": 0.8,          # seconds until the full (non-streamed) response is ready
+    "first_chunk": 0.3,      # seconds until the first streamed chunk
+    "chunk_interval": 0.05,  # seconds between streamed chunks
+    "chunks": 12,
+    "error_rate": 0.0,       # fraction of calls that raise FakeQuotaError
+}
+
+
+try:
+    # Subclass the real 429 so retry logic treats simulated errors like real ones
+    from google.api_core.exceptions import ResourceExhausted as _QuotaBase
+except ImportError:
+    _QuotaBase = Exception
+
+
+class FakeQuotaError(_QuotaBase):
+    """Raised for simulated 429s."""
+
+
+def _prompt(contents):
+    return contents if isinstance(contents, str) else " ".join(c for c in contents if isinstance(c, str))
+
+
+def _answer(contents):
+    words = f"This is a simulated answer to: {_prompt(contents).strip()[:200]}. It has a second sentence for TTS.".split()
+    return words
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+def _usage(prompt_tokens, completion_tokens):
+    return types.SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=completion_tokens,
+                                 total_token_count=prompt_tokens + completion_tokens)
+
+
+class FakeResponse:
+    def __init__(self, words, stream, prompt_tokens=0):
+        self._words = words
+        self._stream = stream
+        self._prompt_tokens = prompt_tokens
+        # Like the SDK, a stream only reports its usage once it has been consumed
+        self.usage_metadata = _usage(0, 0) if stream else _usage(prompt_tokens, len(words))
+
+    @property
+    def text(self):
+        return " ".join(self._words)
+
+    def __iter__(self):
+        n = max(1, CONFIG["chunks"])
+        size = max(1, len(self._words) // n)
+        for i in range(0, len(self._words), size):
+            time.sleep(CONFIG["first_chunk"] if i == 0 else CONFIG["chunk_interval"])
+            yield _Chunk(" ".join(self._words[i:i + size]) + " ")
+        self.usage_metadata = _usage(self._prompt_tokens, len(self._words))
+
+
+class GenerativeModel:
+    def __init__(self, model_name="models/fake", **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        if random.random() < CONFIG["error_rate"]:
+            time.sleep(CONFIG["first_chunk"])
+            raise FakeQuotaError("simulated quota exhaustion")
+        if not stream:
+            time.sleep(CONFIG["latency"])
+        return FakeResponse(_answer(contents), stream, prompt_tokens=len(_prompt(contents).split()))
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history or [])
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history)
+
+    def send_message(self, content, stream=False, **kwargs):
+        response = self.model.generate_content(content, stream=stream)
+        self.history.append({"role": "user", "parts": [content]})
+        self.history.append({"role": "model", "parts": [response.text]})
+        return response
+
+
+def configure(**kwargs):
+    pass
+
+
+def get_model(name):
+    return types.SimpleNamespace(name=name)
+
+
+def list_models():
+    return [types.SimpleNamespace(name="models/fake")]
+
+
+def install():
+    """Make `import google.generativeai` resolve to this module."""
+    if "google" not in sys.modules:
+        try:
+            import google  # noqa: F401
+        except ImportError:
+            sys.modules["google"] = types.ModuleType("google")
+    module = sys.modules[__name__]
+    sys.modules["google.generativeai"] = module
+    sys.modules["google"].generativeai = module
+    return module
@@ -0,0 +1,61 @@
+"""
+Stub TTS and emotion models for benchmarks.
+
+stub_synthesizer plugs into ttsCache in place of gTTS. install_fake_emotion_models()
+swaps the transformers classifier for a keyword scorer and registers a fake
+deepface module, so emotion benchmarks run without downloading any weights.
+"""
+
+import sys
+import time
+import types
+
+CONFIG = {
+    "tts_sec_per_100_chars": 0.3,
+    "text_emotion_sec": 0.02,   # per batch
+    "face_emotion_sec": 0.15,
+}
+
+LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+
+
+def stub_synthesizer(text, lang, path):
+    time.sleep(CONFIG["tts_sec_per_100_chars"] * len(text) / 100)
+    with open(path, "wb") as f:
+        f.write(b"ID3" + text.encode("utf-8")[:1024])
+
+
+def _fake_text_classifier():
+    def classify(texts, batch_size=None, truncation=None):
+        time.sleep(CONFIG["text_emotion_sec"])
+        single = isinstance(texts, str)
+        results = []
+        for text in [texts] if single else texts:
+            scores = [{"label": label, "score": 0.9 if label in text.lower() else 0.1 / len(LABELS)}
+                      for label in LABELS]
+            if all(s["score"] < 0.5 for s in scores):
+                scores[LABELS.index("neutral")]["score"] = 0.9
+            results.append(scores)
+        return results
+    return classify
+
+
+def _fake_deepface_module():
+    def analyze(img, actions=None, enforce_detection=True, **kwargs):
+        time.sleep(CONFIG["face_emotion_sec"])
+        return [{"dominant_emotion": "neutral", "emotion": {label: 100 / len(LABELS) for label in LABELS}}]
+
+    def build_model(model_name=None, task=None):
+        return types.SimpleNamespace(name=model_name)
+
+    deepface = types.ModuleType("deepface")
+    deepface.DeepFace = types.SimpleNamespace(analyze=analyze, build_model=build_model)
+    return deepface
+
+
+def install_fake_emotion_models():
+    import emotionModels
+
+    sys.modules["deepface"] = _fake_deepface_module()
+    emotionModels.set_factory("text", _fake_text_classifier)
+    emotionModels.set_factory("face", lambda: None)
@@ -0,0 +1,131 @@
+"""
+Import-time profile of the app's entry points.
+
+Each target runs in a fresh interpreter under `python -X importtime`, executing
+only the target's top-level import statements (so page scripts are profiled
+without running their UI). Reports wall time, RSS after import and the most
+expensive top-level packages, and saves JSON next to the load-test results so
+startup cost can be tracked across commits.
+
+    python -m benchmarks.importProfile
+    python -m benchmarks.importProfile pages/emotion.py --top 15
+    python -m benchmarks.importProfile --budget-sec 3 --compare benchmark_results/<older>.json
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks.run import ROOT, git_commit
+
+DEFAULT_TARGETS = ["app.py", "pages/qachat.py", "pages/emotion.py", "pages/metrics.py", "AccuracyEval.py"]
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)")
+
+# Runs in the child: time the imports, then report RSS as the last stdout line
+_CHILD = """
+import json, resource, sys, time
+sys.stderr.write("--- target imports ---\\n")
+start = time.perf_counter()
+{imports}
+wall = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"wall_sec": wall, "rss_mb": rss_kb / (1024 * 1024 if sys.platform == "darwin" else 1024)}}))
+"""
+
+
+def import_statements(target):
+    """Source of the top-level imports in a script, or `import target` for a module name."""
+    if not target.endswith(".py"):
+        return f"import {target}"
+    with open(os.path.join(ROOT, target), encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=target)
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in nodes)
+
+
+def profile(target):
+    code = _CHILD.format(imports=import_statements(target))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.getenv("PYTHONPATH")])))
+    env.pop("METRICS_SHARED_DB", None)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+
+    # Self time summed per top-level package, so e.g. everything TensorFlow loads counts once
+    packages = {}
+    log = proc.stderr.split("--- target imports ---\n", 1)[-1]
+    for line in log.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, name = int(match.group(1)), match.group(3)
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + self_us / 1e6
+
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["wall_sec"] = round(result["wall_sec"], 3)
+    result["rss_mb"] = round(result["rss_mb"], 1)
+    result["packages"] = {name: round(sec, 3) for name, sec in sorted(packages.items(), key=lambda kv: -kv[1])}
+    return result
+
+
+def compare(results, path):
+    with open(path, encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"\nCompared with {os.path.basename(path)} ({previous.get('commit')}):")
+    for target, now in results["targets"].items():
+        before = previous.get("targets", {}).get(target)
+        if not before or "error" in before or "error" in now:
+            continue
+        for key in ("wall_sec", "rss_mb"):
+            change = (now[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            print(f"  {target:20} {key:8} {before[key]:>8} -> {now[key]:>8} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time and baseline RSS of each entry point.")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="scripts (*.py) or module names")
+    parser.add_argument("--top", type=int, default=8, help="packages to list per target")
+    parser.add_argument("--budget-sec", type=float, help="exit with status 1 if any target imports slower than this")
+    parser.add_argument("--output-dir", default=os.path.join(ROOT, "benchmark_results"))
+    parser.add_argument("--compare", help="earlier import profile JSON to diff against")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "targets": {},
+    }
+    over_budget = []
+    for target in args.targets:
+        results["targets"][target] = stats = profile(target)
+        if "error" in stats:
+            print(f"▶ {target}: {stats['error']}")
+            continue
+        print(f"▶ {target}: {stats['wall_sec']}s, {stats['rss_mb']} MB RSS")
+        for name, sec in list(stats["packages"].items())[:args.top]:
+            print(f"    {name:28} {sec:>7.3f}s")
+        if args.budget_sec and stats["wall_sec"] > args.budget_sec:
+            over_budget.append(target)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"imports-{datetime.now():%Y%m%d-%H%M%S}-{results['commit']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📊 Results saved to '{path}'")
+
+    if args.compare:
+        compare(results, args.compare)
+    if over_budget:
+        print(f"\n❌ Over the {args.budget_sec}s import budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
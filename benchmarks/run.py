@@ -0,0 +1,228 @@
+"""
+Offline load test for the page functions.
+
+Drives get_gemini_response, text_to_speech, detect_text_emotion and
+detect_image_emotion from N concurrent simulated sessions against the local
+Gemini stand-in (benchmarks/fakeGenai.py) and stub TTS/emotion models, then
+reports throughput, latency percentiles and peak RSS. Results are written as
+JSON so runs from different commits can be compared.
+
+    python -m benchmarks.run --sessions 16 --requests 10
+    python -m benchmarks.run --scenarios text_emotion --real-models
+    python -m benchmarks.run --compare benchmark_results/<older>.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ["image_chat", "image_chat_stream", "tts", "text_emotion", "image_emotion"]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class RSSSampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        process = psutil.Process()
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process.memory_info().rss)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def setup(args, workdir):
+    """Point caches and logs at a scratch dir and install the fakes before importing app code."""
+    os.environ["RESPONSE_CACHE_DB"] = os.path.join(workdir, "response_cache.sqlite3")
+    os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts_cache")
+    os.environ["PERF_LOG_FILE"] = os.path.join(workdir, "performance_log.csv")
+    os.environ["EMBEDDING_CACHE_DIR"] = os.path.join(workdir, "embedding_cache")
+    sys.path.insert(0, ROOT)
+
+    from benchmarks import fakeGenai, fakeModels
+
+    fakeGenai.CONFIG.update(latency=args.latency, first_chunk=args.first_chunk,
+                            chunk_interval=args.chunk_interval, error_rate=args.error_rate)
+    fakeGenai.install()
+    if not args.real_models:
+        fakeModels.install_fake_emotion_models()
+
+    import ttsCache
+    if not args.real_tts:
+        ttsCache.get_tts_cache(synthesizer=fakeModels.stub_synthesizer)
+
+
+def make_calls(args):
+    import numpy as np
+
+    from imageChat import get_gemini_response, text_to_speech
+    from emotionAnalysis import detect_text_emotion, detect_image_emotion
+    from AccuracyEval import DEFAULT_DATASET, load_dataset
+
+    queries = [row["query"] for row in load_dataset(DEFAULT_DATASET)]
+    face = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def prompt(session, i):
+        text = queries[(session * args.requests + i) % len(queries)]
+        return text if args.repeat_prompts else f"{text} [session {session} request {i}]"
+
+    def image_chat(session, i):
+        get_gemini_response(prompt(session, i), "", None)
+
+    def image_chat_stream(session, i):
+        start = time.perf_counter()
+        first = None
+        for _ in get_gemini_response(prompt(session, i), "", None, stream=True):
+            if first is None:
+                first = time.perf_counter() - start
+        return {"time_to_first_token": first}
+
+    def tts(session, i):
+        text_to_speech(f"Here is spoken answer number {i} for session {session}. " * 3)
+
+    def text_emotion(session, i):
+        detect_text_emotion(prompt(session, i))
+
+    def image_emotion(session, i):
+        result = detect_image_emotion(face)
+        if result.startswith("Error"):
+            raise RuntimeError(result)
+
+    return {"image_chat": image_chat, "image_chat_stream": image_chat_stream, "tts": tts,
+            "text_emotion": text_emotion, "image_emotion": image_emotion}
+
+
+def run_scenario(call, sessions, requests):
+    latencies, extras, errors = [], {}, []
+    lock = threading.Lock()
+
+    def session_loop(session):
+        for i in range(requests):
+            start = time.perf_counter()
+            try:
+                extra = call(session, i) or {}
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__)
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                for k, v in extra.items():
+                    if v is not None:
+                        extras.setdefault(k, []).append(v)
+
+    with RSSSampler() as rss:
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            list(pool.map(session_loop, range(sessions)))
+        wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    result = {
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "wall_sec": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else None,
+        "peak_rss_mb": round(rss.peak / (1024 * 1024), 1),
+    }
+    for name, values in [("latency", latencies)] + sorted(extras.items()):
+        values = sorted(values)
+        for q in (0.5, 0.95, 0.99):
+            p = percentile(values, q)
+            result[f"{name}_p{int(q * 100)}_sec"] = round(p, 4) if p is not None else None
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, previous_path):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous['commit']} ({previous['timestamp']}):")
+    for name, now in current["scenarios"].items():
+        before = previous["scenarios"].get(name)
+        if not before:
+            continue
+        for key in ("throughput_rps", "latency_p95_sec"):
+            if before.get(key) and now.get(key) is not None:
+                change = (now[key] - before[key]) / before[key] * 100
+                print(f"  {name:18} {key:16} {before[key]:>9} -> {now[key]:>9} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against a local Gemini stand-in.")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated sessions")
+    parser.add_argument("--requests", type=int, default=10, help="requests per session per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.8, help="fake non-streamed response latency (s)")
+    parser.add_argument("--first-chunk", type=float, default=0.3, help="fake time to first streamed chunk (s)")
+    parser.add_argument("--chunk-interval", type=float, default=0.05, help="fake delay between chunks (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake calls that fail with 429")
+    parser.add_argument("--repeat-prompts", action="store_true", help="reuse prompts so caches can hit")
+    parser.add_argument("--real-models", action="store_true", help="use the real transformers/DeepFace models")
+    parser.add_argument("--real-tts", action="store_true", help="use gTTS instead of the stub synthesizer")
+    parser.add_argument("--output-dir", default=os.path.join(ROOT, "benchmark_results"))
+    parser.add_argument("--compare", help="earlier result JSON to diff against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="aiimagechat-bench-")
+    setup(args, workdir)
+    calls = make_calls(args)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "scenarios": {},
+    }
+    for name in args.scenarios.split(","):
+        print(f"▶ {name}: {args.sessions} sessions x {args.requests} requests")
+        results["scenarios"][name] = stats = run_scenario(calls[name], args.sessions, args.requests)
+        print("  " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{datetime.now():%Y%m%d-%H%M%S}-{results['commit']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📊 Results saved to '{path}'")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Bounded conversation memory for long chat sessions.
+
+The full transcript is kept for display, but the history sent to Gemini is
+capped at CHAT_HISTORY_TOKENS. Once the recent turns outgrow that budget the
+oldest ones are folded into a rolling summary by a background worker, so the
+request path never waits for summarization and per-turn cost stays flat.
+
+With a conversationStore attached, turns and the summary are persisted, and
+restore() rebuilds a session from the summary plus only its newest turns;
+older history pages are read from the store when they are viewed.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from conversationStore import RESTORE_WINDOW
+from geminiClient import get_client
+from performanceLogger import span
+from usageAccounting import estimate_tokens, record
+
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", 2000))
+SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "models/gemini-2.5-flash")
+
+_summarizer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
+
+class ConversationMemory:
+    def __init__(self, model, max_tokens=CHAT_HISTORY_TOKENS, store=None, session=None, page_name="qachat"):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.turns = []        # loaded transcript as (role, text); role is "You" or "Bot"
+        self.offset = 0        # stored turns older than self.turns[0] that were not loaded
+        self.summary = ""
+        self.summarized = 0    # number of leading turns of self.turns folded into the summary
+        self.store = store
+        self.session = session
+        self.page_name = page_name
+        self._pending = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def restore(cls, model, store, session, page_name, window=RESTORE_WINDOW, max_tokens=CHAT_HISTORY_TOKENS):
+        """Resume a stored session: its summary, every unsummarized turn and at least `window` recent turns."""
+        memory = cls(model, max_tokens, store, session, page_name)
+        total = store.count(session, page_name)
+        summary, summarized = store.summary(session, page_name)
+        load = min(total, max(window, total - summarized))
+        memory.turns = store.recent(session, page_name, load)
+        memory.offset = total - load
+        memory.summary = summary
+        memory.summarized = max(0, summarized - memory.offset)
+        return memory
+
+    def add(self, role, text):
+        with self._lock:
+            self.turns.append((role, text))
+        if self.store is not None:
+            self.store.append(self.session, self.page_name, role, text)
+        self._maybe_summarize()
+
+    def context_history(self, max_tokens=None):
+        """Gemini history: the rolling summary plus the newest turns that fit the budget."""
+        with self._lock:
+            recent = self.turns[self.summarized:]
+            summary = self.summary
+        budget = (self.max_tokens if max_tokens is None else max_tokens) - estimate_tokens(summary)
+        window = []
+        for role, text in reversed(recent):
+            budget -= estimate_tokens(text)
+            if budget < 0:
+                break  # older turns are dropped until the summary catches up
+            window.append((role, text))
+        window.reverse()
+        # Gemini expects the history to start with a user turn
+        while window and window[0][0] != "You":
+            window.pop(0)
+
+        history = []
+        if summary:
+            history.append({"role": "user", "parts": [f"Summary of our earlier conversation: {summary}"]})
+            history.append({"role": "model", "parts": ["Understood, I'll keep that in mind."]})
+        for role, text in window:
+            history.append({"role": "user" if role == "You" else "model", "parts": [text]})
+        return history
+
+    def _maybe_summarize(self):
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return
+            recent = self.turns[self.summarized:]
+            if sum(estimate_tokens(t) for _, t in recent) <= self.max_tokens:
+                return
+            # Fold the oldest turns until what remains fits in half the budget
+            remaining = sum(estimate_tokens(t) for _, t in recent)
+            fold = 0
+            while fold < len(recent) and remaining > self.max_tokens // 2:
+                remaining -= estimate_tokens(recent[fold][1])
+                fold += 1
+            fold += fold % 2  # keep question/answer pairs together
+            fold = min(fold, len(recent))
+            end = self.summarized + fold
+            self._pending = _summarizer.submit(self._summarize, self.summary, recent[:fold], end)
+
+    def _summarize(self, previous, turns, end):
+        transcript = "\n".join(f"{role}: {text}" for role, text in turns)
+        prompt = (
+            "Update the running summary of a conversation. Keep names, facts, preferences and open "
+            "questions; be concise.\n\n"
+            f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}\n\nUpdated summary:"
+        )
+        with span("Chat Summary", self.page_name) as s:
+            try:
+                response = get_client().generate(self.model, prompt)
+                summary = response.text.strip()
+            except Exception as e:
+                s.fields["error"] = type(e).__name__
+                print(f"chatMemory: summarization failed: {e}")
+                return
+            record(getattr(self.model, "model_name", SUMMARY_MODEL), response, prompt, summary)
+        with self._lock:
+            self.summary = summary
+            self.summarized = end
+            covered = self.offset + end
+        if self.store is not None:
+            self.store.save_summary(self.session, self.page_name, summary, covered)
+
+    def page(self, page, page_size):
+        """Return one page of the transcript, newest page first (page 0)."""
+        with self._lock:
+            total = self.offset + len(self.turns)
+            end = max(0, total - page * page_size)
+            start = max(0, end - page_size)
+            if start >= self.offset:
+                return self.turns[start - self.offset:end - self.offset]
+        # Older than the restored window: read just this page from the store
+        return self.store.recent(self.session, self.page_name, end - start, skip=total - end)
+
+    def page_count(self, page_size):
+        return max(1, -(-(self.offset + len(self.turns)) // page_size))
@@ -0,0 +1,153 @@
+"""
+Persistent conversation store shared by the chat pages.
+
+Every turn is appended to a SQLite database in WAL mode, indexed by session id
+and page, so a reload (or a different worker process) can pick a session back
+up. Writes are queued and committed in batches from a daemon thread, off the
+request path. Reads are paginated: resuming a long session loads only the
+newest window of turns plus the rolling summary kept by chatMemory.
+
+The session id is kept in session state and mirrored into the page URL
+(?sid=...) on every run, so it survives page switches and reloading the
+browser tab resumes the same conversation.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+CONVERSATION_DB = os.getenv("CONVERSATION_DB", "conversations.sqlite3")
+CONVERSATION_FLUSH_SEC = float(os.getenv("CONVERSATION_FLUSH_SEC", 0.5))
+RESTORE_WINDOW = int(os.getenv("CONVERSATION_RESTORE_WINDOW", 20))
+
+
+def session_id():
+    """Conversation id for this browser tab, kept in the URL so it survives reloads."""
+    sid = st.session_state.get("conversation_sid")
+    if not sid:
+        # First run of this session: resume the id from the URL, or start a new conversation
+        sid = st.query_params.get("sid") or uuid.uuid4().hex
+        st.session_state["conversation_sid"] = sid
+    # Page switches drop the query string, so put the id back on every run
+    if st.query_params.get("sid") != sid:
+        st.query_params["sid"] = sid
+    return sid
+
+
+class ConversationStore:
+    def __init__(self, path=CONVERSATION_DB, flush_interval=CONVERSATION_FLUSH_SEC):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, page TEXT NOT NULL, "
+            "role TEXT NOT NULL, text TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, page, id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "session_id TEXT NOT NULL, page TEXT NOT NULL, summary TEXT NOT NULL, "
+            "summarized INTEGER NOT NULL, updated REAL NOT NULL, PRIMARY KEY (session_id, page))"
+        )
+        self._conn.commit()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="conversation-store")
+        self._thread.start()
+
+    # ------------------------------------------------------------------ writes
+
+    def append(self, session, page, role, text):
+        """Queue one turn; it is committed with the next batch."""
+        self._queue.put(("message", (session, page, role, text, time.time())))
+
+    def save_summary(self, session, page, summary, summarized):
+        """Record the rolling summary and how many leading turns it covers."""
+        self._queue.put(("summary", (session, page, summary, summarized, time.time())))
+
+    def _drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        # Drain under the lock so concurrent flushes commit turns in the order they were queued
+        with self._lock:
+            items = self._drain()
+            if items:
+                self._write(items)
+
+    def _write(self, items):
+        messages = [row for kind, row in items if kind == "message"]
+        summaries = [row for kind, row in items if kind == "summary"]
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, page, role, text, created) VALUES (?, ?, ?, ?, ?)", messages
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO summaries (session_id, page, summary, summarized, updated) "
+                    "VALUES (?, ?, ?, ?, ?)", summaries
+                )
+        except sqlite3.Error as e:
+            print(f"conversationStore: failed to write {len(items)} items: {e}")
+
+    # ------------------------------------------------------------------ reads
+
+    def count(self, session, page):
+        self.flush()  # make this process's queued turns visible
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ? AND page = ?", (session, page)
+            ).fetchone()[0]
+
+    def recent(self, session, page, limit, skip=0):
+        """Up to limit turns ending skip turns before the newest, oldest first, as (role, text)."""
+        self.flush()
+        with self._lock:
+            # Walks the index backwards from the newest turn, so only the requested window is read
+            rows = self._conn.execute(
+                "SELECT role, text FROM messages WHERE session_id = ? AND page = ? "
+                "ORDER BY id DESC LIMIT ? OFFSET ?",
+                (session, page, limit, skip),
+            ).fetchall()
+        return [tuple(row) for row in reversed(rows)]
+
+    def summary(self, session, page):
+        """(summary, summarized) for a session, or ("", 0)."""
+        self.flush()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, summarized FROM summaries WHERE session_id = ? AND page = ?", (session, page)
+            ).fetchone()
+        return tuple(row) if row else ("", 0)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConversationStore()
+            atexit.register(_store.flush)
+        return _store
@@ -0,0 +1,148 @@
+"""
+Persistent sentence-embedding cache.
+
+Vectors for each embedding model are appended to a raw float32 file that is
+read back as a memory-mapped NumPy array, with a JSON index mapping a hash of
+each text to its row. Only texts that are not in the store yet are encoded, and
+the SentenceTransformer model is loaded only when that happens.
+
+Writers (threads or concurrent AccuracyEval runs) are serialized with a lock
+file. New rows are numbered from the actual length of the vector file, and rows
+left behind by a crash between the vector and index writes are truncated when
+the store is loaded.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on path held across processes."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class EmbeddingStore:
+    def __init__(self, model_name, root=EMBEDDING_CACHE_DIR, embedder=None):
+        self.model_name = model_name
+        self.dir = os.path.join(root, re.sub(r"[^\w.-]", "_", model_name))
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.index_path = os.path.join(self.dir, "index.json")
+        self.lock_path = os.path.join(self.dir, ".lock")
+        self._embedder = embedder
+        self._lock = threading.Lock()
+        self._vectors = None
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.dim = None
+        self.index = {}
+        with _file_lock(self.lock_path):
+            self._sync()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from sentence_transformers import SentenceTransformer
+            self._embedder = SentenceTransformer(self.model_name)
+        return self._embedder
+
+    def _rows_on_disk(self):
+        if not self.dim or not os.path.isfile(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def _sync(self):
+        """Reload the index (another process may have added rows) and repair the vector file; needs the file lock."""
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim, self.index = meta["dim"], meta["index"]
+        self._vectors = None
+        if not self.dim or not os.path.isfile(self.vectors_path):
+            return
+        rows = self._rows_on_disk()
+        # Entries pointing past the end of the file cannot be read back; forget them
+        self.index = {h: row for h, row in self.index.items() if row < rows}
+        expected = max(self.index.values()) + 1 if self.index else 0
+        if os.path.getsize(self.vectors_path) != expected * 4 * self.dim:
+            # Partial or unindexed rows from an interrupted write
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(expected * 4 * self.dim)
+
+    def _mapped(self, rows):
+        if self._vectors is None or len(self._vectors) < rows:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                      shape=(self._rows_on_disk(), self.dim))
+        return self._vectors
+
+    def encode(self, texts, batch_size=64):
+        """Return an (n, dim) array of unit-normalized embeddings, encoding only unseen texts."""
+        hashes = [text_hash(t) for t in texts]
+        with self._lock:
+            if any(h not in self.index for h in hashes):
+                with _file_lock(self.lock_path):
+                    self._sync()
+                    self._add_missing(hashes, texts, batch_size)
+            if not hashes:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            rows = [self.index[h] for h in hashes]
+            return np.asarray(self._mapped(max(rows) + 1)[rows])
+
+    def _add_missing(self, hashes, texts, batch_size):
+        missing = list({h: t for h, t in zip(hashes, texts) if h not in self.index}.items())
+        if not missing:
+            return  # another process encoded them while we waited for the lock
+        new = self.embedder.encode([t for _, t in missing], batch_size=batch_size,
+                                   convert_to_numpy=True, normalize_embeddings=True)
+        new = np.asarray(new, dtype=np.float32)
+        self.dim = new.shape[1]
+        start = self._rows_on_disk()
+        with open(self.vectors_path, "ab") as f:
+            f.write(new.tobytes())
+        for row, (h, _) in enumerate(missing, start=start):
+            self.index[h] = row
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "index": self.index}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def stats(self):
+        return {"model": self.model_name, "entries": len(self.index), "dim": self.dim}
+
+
+def pairwise_cosine(a, b):
+    """Row-wise cosine similarity of two equally shaped embedding arrays."""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.einsum("ij,ij->i", a, b)
@@ -0,0 +1,142 @@
+"""
+Emotion detection and emotion-aware replies used by pages/emotion.py.
+
+Kept outside the page script so the functions can be imported (e.g. by the
+benchmarks) without running any Streamlit UI code.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from geminiClient import get_client
+import metricsRegistry
+from modelRegistry import get_model
+from emotionModels import get_face_model
+from emotionBatcher import get_batcher, top_label
+from imageResultCache import get_image_cache
+from modelServer import get_model_server, remote_address
+from lazyImport import lazy_import
+import usageAccounting
+from performanceLogger import span
+
+# TensorFlow comes in with DeepFace; load it only when a face is first analysed
+DeepFace = lazy_import("deepface", "DeepFace")
+
+# Gemini model used for emotion-aware replies (configured once per process from GOOGLE_API_KEY)
+EMOTION_CHAT_MODEL = 'gemini-1.5-flash-latest'
+
+# Text classification, face analysis and Gemini calls for one message run side by side here
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("EMOTION_POOL_WORKERS", 8)), thread_name_prefix="emotion")
+
+# Emotion Mapping for Responses
+emotion_responses = {
+    'joy': "I'm glad to hear you're happy! 😊",
+    'anger': "I sense you're upset. Let me know how I can help. 😡",
+    'sadness': "I'm here to listen. Sending virtual hugs. 💙",
+    'fear': "It's okay to feel scared. You're not alone. 🤗",
+    'surprise': "Wow, that sounds exciting! 🎉",
+    'neutral': "Got it! Let's continue our chat. 😌"
+}
+
+def detect_text_emotion(user_input):
+    if remote_address():
+        return get_model_server().call("text_emotion", user_input)
+    # Queued with other sessions' messages and classified in a shared batch
+    emotion_scores = get_batcher().classify(user_input)
+    detected_emotion = top_label(emotion_scores)
+    return detected_emotion
+
+def detect_face_emotions(image, image_hash=None):
+    """Dominant emotion of every face found in image (an RGB/BGR array or PIL image)."""
+    if remote_address():
+        return get_model_server().call("face_emotions", np.asarray(image), image_hash)
+    if image_hash is not None:
+        cached = get_image_cache().lookup("deepface", image_hash)
+        if cached is not None:
+            return cached
+    image_np = np.asarray(image)  # no copy when given an ndarray
+    get_face_model()  # shared DeepFace emotion model, built on first use
+    faces = DeepFace.analyze(image_np, actions=['emotion'], enforce_detection=False)
+    emotions = [face['dominant_emotion'] for face in faces or []]
+    if image_hash is not None:
+        get_image_cache().store("deepface", image_hash, emotions)
+    return emotions
+
+def detect_image_emotion(image, image_hash=None):
+    try:
+        emotions = detect_face_emotions(image, image_hash)
+        if not emotions:
+            return "No emotion detected"
+        unique_emotions = set(emotions)
+        if len(unique_emotions) == 1:
+            return f"Detected emotion: {emotions[0]}"
+        else:
+            return f"Detected emotions: {', '.join(unique_emotions)}"
+    except Exception as e:
+        return f"Error in detecting emotion: {str(e)}"
+
+def build_prompt(user_input, emotion, face_emotions=None):
+    if face_emotions:
+        return (f"User is feeling {emotion} (facial expression: {', '.join(sorted(set(face_emotions)))}). "
+                f"Respond appropriately: {user_input}")
+    return f"User is feeling {emotion}. Respond appropriately: {user_input}"
+
+def generate_response(user_input, emotion, face_emotions=None, budget=None):
+    # Its own span, so tokens and cost land in a performance record even when run on _pool
+    with span("Emotion Chat", user_input, emotion=emotion):
+        prompt = build_prompt(user_input, emotion, face_emotions)
+        gemini_response = get_client().generate(get_model(EMOTION_CHAT_MODEL), prompt)
+        usageAccounting.record(EMOTION_CHAT_MODEL, gemini_response, prompt, gemini_response.text, budget=budget)
+    return gemini_response.text
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def analyze_message(user_input, image=None, speculate=False, guess="neutral", image_hash=None, budget=None):
+    """
+    Run text emotion and face emotion at the same time, merge both into the prompt and
+    generate the reply. With speculate=True (text-only messages) the Gemini request is
+    sent right away assuming the emotion is `guess`; the answer is kept if the classifier
+    agrees, otherwise a corrected request is sent. Every Gemini call, including a
+    discarded speculative one, is charged to budget.
+    """
+    start = time.perf_counter()
+    timings = {}
+    text_future = _pool.submit(_timed, detect_text_emotion, user_input)
+    face_future = _pool.submit(_timed, detect_face_emotions, image, image_hash) if image is not None else None
+    spec_future = _pool.submit(_timed, generate_response, user_input, guess, None, budget) if speculate and image is None else None
+
+    emotion, timings["text_emotion_sec"] = text_future.result()
+    face_emotions, face_error = None, None
+    if face_future is not None:
+        try:
+            face_emotions, timings["face_emotion_sec"] = face_future.result()
+        except Exception as e:
+            face_error = str(e)
+
+    speculation = None
+    if spec_future is not None and emotion == guess:
+        speculation = "hit"
+        response, timings["gemini_sec"] = spec_future.result()
+    else:
+        if spec_future is not None:
+            speculation = "miss"
+            spec_future.cancel()
+        response, timings["gemini_sec"] = _timed(generate_response, user_input, emotion, face_emotions, budget)
+    timings["total_sec"] = time.perf_counter() - start
+    for stage, seconds in timings.items():
+        metricsRegistry.observe("emotion_stage_seconds", seconds, stage=stage[:-4])
+
+    return {
+        "emotion": emotion,
+        "face_emotions": face_emotions,
+        "face_error": face_error,
+        "response": response,
+        "speculation": speculation,
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+    }
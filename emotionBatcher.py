@@ -0,0 +1,126 @@
+"""
+Micro-batching text emotion inference.
+
+Concurrent sessions submit single messages; a worker thread gathers them into
+batches of up to BATCH_SIZE (waiting at most MAX_WAIT_MS for the batch to fill),
+runs the classifier once per batch and hands each caller its own result.
+classify_many() runs the same backend directly over a list for offline use.
+
+The backend is the transformers pipeline from emotionModels by default. Setting
+TEXT_EMOTION_BACKEND=onnx or int8 switches to an ONNX Runtime export (via
+optimum) or a dynamically int8-quantized torch model for faster CPU inference.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import metricsRegistry
+from emotionModels import TEXT_EMOTION_MODEL, get_text_classifier, set_factory
+
+BATCH_SIZE = int(os.getenv("EMOTION_BATCH_SIZE", 16))
+MAX_WAIT_MS = float(os.getenv("EMOTION_BATCH_MAX_WAIT_MS", 10))
+TEXT_EMOTION_BACKEND = os.getenv("TEXT_EMOTION_BACKEND", "pytorch")
+
+
+def _build_onnx_classifier():
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer, pipeline
+    tokenizer = AutoTokenizer.from_pretrained(TEXT_EMOTION_MODEL)
+    model = ORTModelForSequenceClassification.from_pretrained(TEXT_EMOTION_MODEL, export=True)
+    return pipeline("text-classification", model=model, tokenizer=tokenizer, top_k=None)
+
+
+def _build_int8_classifier():
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+    tokenizer = AutoTokenizer.from_pretrained(TEXT_EMOTION_MODEL)
+    model = AutoModelForSequenceClassification.from_pretrained(TEXT_EMOTION_MODEL)
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("text-classification", model=model, tokenizer=tokenizer, top_k=None)
+
+
+if TEXT_EMOTION_BACKEND == "onnx":
+    set_factory("text", _build_onnx_classifier)
+elif TEXT_EMOTION_BACKEND == "int8":
+    set_factory("text", _build_int8_classifier)
+
+
+def classify_many(texts, batch_size=BATCH_SIZE):
+    """Return the per-label score list for each text, running the model in batches."""
+    texts = list(texts)
+    if not texts:
+        return []
+    classifier = get_text_classifier()
+    return list(classifier(texts, batch_size=batch_size, truncation=True))
+
+
+def top_label(scores):
+    return max(scores, key=lambda x: x['score'])['label']
+
+
+class EmotionBatcher:
+    def __init__(self, batch_size=BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def classify(self, text, timeout=None):
+        return self.submit(text).result(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            texts = [text for text, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = classify_many(texts, self.batch_size)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            metricsRegistry.observe("emotion_inference_seconds", time.perf_counter() - start)
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), scores in zip(batch, results):
+                future.set_result(scores)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = EmotionBatcher()
+        return _batcher
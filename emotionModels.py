@@ -0,0 +1,99 @@
+"""
+Lazy, once-per-process loading of the emotion models.
+
+The text classifier and the DeepFace emotion model are only built on first use
+and then shared by every session in the process. Load time and RSS growth are
+recorded for each model. Factories can be replaced (e.g. with tiny local models)
+through set_factory before anything is loaded.
+"""
+
+import os
+import threading
+import time
+
+import psutil
+
+TEXT_EMOTION_MODEL = os.getenv("TEXT_EMOTION_MODEL", "j-hartmann/emotion-english-distilroberta-base")
+
+
+def _build_text_classifier():
+    from transformers import pipeline
+    return pipeline("text-classification", model=TEXT_EMOTION_MODEL, return_all_scores=True)
+
+
+def _build_face_model():
+    from deepface import DeepFace
+    try:
+        return DeepFace.build_model(model_name="Emotion", task="facial_attribute")
+    except TypeError:  # older deepface releases take only the model name
+        return DeepFace.build_model("Emotion")
+
+
+_factories = {"text": _build_text_classifier, "face": _build_face_model}
+_models = {}
+_load_stats = {}
+_lock = threading.Lock()          # guards the dicts above
+_build_locks = {}                 # one per model, held only while that model is built
+
+
+def set_factory(name, factory):
+    """Replace how a model is built and drop any already loaded instance."""
+    with _lock:
+        _factories[name] = factory
+        _models.pop(name, None)
+        _load_stats.pop(name, None)
+
+
+def _get(name):
+    model = _models.get(name)
+    if model is not None:
+        return model  # loaded models are served without taking any lock
+    with _lock:
+        build_lock = _build_locks.setdefault(name, threading.Lock())
+    # Building one model (e.g. DeepFace/TensorFlow) never blocks callers of another
+    with build_lock:
+        if name not in _models:
+            process = psutil.Process()
+            rss_before = process.memory_info().rss
+            start = time.perf_counter()
+            model = _factories[name]()
+            with _lock:
+                _models[name] = model
+                _load_stats[name] = {
+                    "load_time_sec": round(time.perf_counter() - start, 2),
+                    "rss_delta_mb": round((process.memory_info().rss - rss_before) / (1024 * 1024), 2),
+                }
+        return _models[name]
+
+
+def get_text_classifier():
+    return _get("text")
+
+
+def get_face_model():
+    return _get("face")
+
+
+def load_stats():
+    stats = dict(_load_stats)
+    stats["rss_mb"] = round(psutil.Process().memory_info().rss / (1024 * 1024), 2)
+    return stats
+
+
+_warm_thread = None
+
+
+def warm_up_in_background(names=("text", "face")):
+    """Start loading models on a daemon thread; only the first call does anything."""
+    global _warm_thread
+    if _warm_thread is None:
+        def _load_all():
+            for name in names:
+                try:
+                    _get(name)
+                except Exception as e:
+                    _load_stats[name] = {"error": str(e)}
+
+        _warm_thread = threading.Thread(target=_load_all, daemon=True)
+        _warm_thread.start()
+    return _warm_thread
@@ -0,0 +1,234 @@
+"""
+Async request layer for Gemini calls.
+
+All calls go through one asyncio event loop running on a background thread, so
+the Streamlit script thread (or any worker thread) can use the blocking helpers
+while the loop enforces:
+
+* a per-call deadline covering all attempts and, for streams, every chunk,
+* jittered exponential backoff on retryable errors (429, 5xx, timeouts),
+* a token-bucket rate limit shared by every session in the process,
+* optional hedging: if no answer arrives within hedge_after seconds a
+  duplicate request is sent and the first successful answer wins.
+
+The wrapped callables are plain functions (model.generate_content,
+chat.send_message, ...), so tests can point it at the local fake backend in
+benchmarks/fakeGenai.py.
+"""
+
+import asyncio
+import functools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metricsRegistry
+
+GEMINI_RPS = float(os.getenv("GEMINI_RPS", 5))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", 10))
+GEMINI_DEADLINE_SEC = float(os.getenv("GEMINI_DEADLINE_SEC", 60))
+GEMINI_RETRIES = int(os.getenv("GEMINI_RETRIES", 3))
+GEMINI_HEDGE_AFTER_SEC = float(os.getenv("GEMINI_HEDGE_AFTER_SEC", 0)) or None
+
+_retryable_errors = None
+
+
+def retryable_errors():
+    """
+    Exception types worth retrying (429, 5xx, timeouts). google.api_core is only
+    imported on the first call, so importing this module stays cheap.
+    """
+    global _retryable_errors
+    if _retryable_errors is None:
+        try:
+            from google.api_core import exceptions as api_exceptions
+        except ImportError:  # no Gemini SDK installed, so no Gemini errors to retry
+            _retryable_errors = (asyncio.TimeoutError,)
+        else:
+            _retryable_errors = (
+                api_exceptions.ResourceExhausted,
+                api_exceptions.ServiceUnavailable,
+                api_exceptions.DeadlineExceeded,
+                api_exceptions.InternalServerError,
+                asyncio.TimeoutError,
+            )
+    return _retryable_errors
+
+
+class TokenBucket:
+    """Async token bucket; only touched from the client's event loop."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_DONE = object()
+
+
+class PrimedStream:
+    """
+    A streamed response whose first chunk was already pulled. Iterating yields every
+    chunk, each within what is left of the call's deadline; other attributes
+    (usage_metadata, text, ...) come from the SDK response, which fills them in as
+    the stream is consumed.
+    """
+
+    def __init__(self, response, first, iterator):
+        self.response = response
+        self._first = first
+        self._iterator = iterator
+        self._client = None
+        self._end = None
+
+    def _limit(self, client, end):
+        self._client, self._end = client, end
+        return self
+
+    def __iter__(self):
+        first, self._first = self._first, []
+        yield from first
+        while True:
+            if self._client is None:
+                chunk = next(self._iterator, _DONE)
+            else:
+                chunk = self._client.next_chunk(self._iterator, self._end)
+            if chunk is _DONE:
+                return
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+
+def _call_and_prime(call):
+    """Pull the first streamed chunk so errors before the first token happen inside the retry loop."""
+    response = call()
+    iterator = iter(response)
+    try:
+        first = [next(iterator)]
+    except StopIteration:
+        first = []
+    return PrimedStream(response, first, iterator)
+
+
+class GeminiClient:
+    def __init__(self, rate=GEMINI_RPS, burst=GEMINI_BURST, deadline=GEMINI_DEADLINE_SEC,
+                 retries=GEMINI_RETRIES, hedge_after=GEMINI_HEDGE_AFTER_SEC,
+                 base_delay=0.5, max_delay=8.0, max_workers=32, retry_on=None):
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on  # exception types to retry; defaults to retryable_errors()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+        self._loop = asyncio.new_event_loop()
+        self._bucket = TokenBucket(rate, burst)
+        threading.Thread(target=self._loop.run_forever, daemon=True, name="gemini-loop").start()
+
+    # ------------------------------------------------------------------ async API
+
+    async def _attempt(self, func, args, kwargs):
+        await self._bucket.acquire()
+        call = functools.partial(func, *args, **kwargs)
+        if kwargs.get("stream"):
+            call = functools.partial(_call_and_prime, call)
+        return await self._loop.run_in_executor(self._executor, call)
+
+    async def _hedged(self, func, args, kwargs, hedge_after):
+        first = asyncio.ensure_future(self._attempt(func, args, kwargs))
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        metricsRegistry.inc("gemini_hedged_requests_total")
+        second = asyncio.ensure_future(self._attempt(func, args, kwargs))
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()  # the executor thread finishes, its result is dropped
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def acall(self, func, *args, deadline=None, retries=None, hedge_after=None, hedge=True, **kwargs):
+        """Call func(*args, **kwargs) with deadline, retries, rate limiting and optional hedging."""
+        deadline = deadline or self.deadline
+        retries = self.retries if retries is None else retries
+        hedge_after = (hedge_after or self.hedge_after) if hedge else None
+        end = time.monotonic() + deadline
+        retry_on = self.retry_on or retryable_errors()
+
+        for attempt in range(retries + 1):
+            remaining = end - time.monotonic()
+            try:
+                if hedge_after and hedge_after < remaining:
+                    coro = self._hedged(func, args, kwargs, hedge_after)
+                else:
+                    coro = self._attempt(func, args, kwargs)
+                result = await asyncio.wait_for(coro, timeout=remaining)
+                # The rest of a stream is read later, by the caller, within the same deadline
+                return result._limit(self, end) if isinstance(result, PrimedStream) else result
+            except retry_on as e:
+                metricsRegistry.inc("gemini_retries_total", error=type(e).__name__)
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if attempt == retries or time.monotonic() + delay >= end:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _next_chunk(self, iterator, timeout):
+        return await asyncio.wait_for(self._loop.run_in_executor(self._executor, next, iterator, _DONE), timeout)
+
+    # ------------------------------------------------------------------ blocking API
+
+    def call(self, func, *args, **kwargs):
+        """Blocking form of acall, safe to use from any thread except the client's loop."""
+        return asyncio.run_coroutine_threadsafe(self.acall(func, *args, **kwargs), self._loop).result()
+
+    def next_chunk(self, iterator, end):
+        """Next chunk of a stream (or _DONE when it ends); TimeoutError if none arrives before end."""
+        future = asyncio.run_coroutine_threadsafe(self._next_chunk(iterator, end - time.monotonic()), self._loop)
+        try:
+            return future.result()
+        except asyncio.TimeoutError:
+            raise TimeoutError("Gemini stream stalled past its deadline") from None
+
+    def generate(self, model, contents, **kwargs):
+        """model.generate_content(contents, **kwargs) through the request layer."""
+        return self.call(model.generate_content, contents, **kwargs)
+
+    def send_message(self, chat, content, **kwargs):
+        # Chat sessions append to their history, so duplicates must never be sent
+        return self.call(chat.send_message, content, hedge=False, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client, so every session shares one rate limit."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient()
+        return _client
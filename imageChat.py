@@ -0,0 +1,87 @@
+"""
+Gemini and text-to-speech calls behind the image chat page (app.py).
+
+Kept outside the page script so the functions can be imported (e.g. by the
+benchmarks) without running any Streamlit UI code.
+"""
+
+from geminiClient import get_client
+from modelRegistry import get_model
+from responseCache import get_response_cache, make_key
+from imageResultCache import get_image_cache
+from ttsCache import get_tts_cache
+import usageAccounting
+from performanceLogger import annotate
+from requestControl import SingleFlight, get_limiter
+
+
+#  Gemini AI response
+MODEL_NAME = 'models/gemini-2.5-flash'
+
+# Identical requests that are in flight at the same time share one Gemini call
+_flights = SingleFlight()
+
+def get_gemini_response(input_text, speech_text, image, image_bytes=None, stream=False, image_hash=None,
+                        image_tokens=0, budget=None, session="default"):
+    # With stream=True an iterator of text chunks is returned instead of a string.
+    # image_hash (a perceptual hash) lets near-duplicate uploads with the same prompt reuse an answer.
+    # Token usage and cost are recorded (and charged to budget, a SessionBudget) once the answer is complete;
+    # image_tokens is the local estimate used when Gemini does not report usage.
+    # session identifies the caller for fair queueing when the adaptive limiter is saturated.
+    combined_input = f"{input_text}\n{speech_text}" if speech_text else input_text
+    if combined_input.strip():
+        cache = get_response_cache()
+        key = make_key(MODEL_NAME, input_text, speech_text, image_bytes)
+        cached = cache.get(key)
+        if cached is None and image_hash is not None:
+            prompt_key = make_key(MODEL_NAME, input_text, speech_text)
+            cached = get_image_cache().lookup("gemini", image_hash, prompt_key)
+        if cached is not None:
+            return iter([cached]) if stream else cached
+        model = get_model(MODEL_NAME)
+        contents = [combined_input, image] if image else [combined_input]
+
+        def call():
+            # For streams the slot is held until the first chunk arrives
+            with get_limiter().slot(session, kind="stream" if stream else "call"):
+                return get_client().generate(model, contents, stream=stream)
+
+        def finish(response, text):
+            # Only the caller that made the upstream call pays for it and caches it
+            usageAccounting.record(MODEL_NAME, response, combined_input, text, image_tokens,
+                                   len(image["data"]) if image else 0, budget)
+            _remember(text, cache, key, image_hash, input_text, speech_text)
+
+        def shared(text):
+            annotate(coalesced=1)
+
+        if stream:
+            chunks, leader = _flights.stream(key + ":stream", call)
+            return _stream_and_cache(chunks, (lambda text: finish(chunks.response, text)) if leader else shared)
+        response, leader = _flights.call(key, call)
+        if leader:
+            finish(response, response.text)
+        else:
+            shared(response.text)
+        return response.text
+    return iter(["Please provide some input."]) if stream else "Please provide some input."
+
+
+def _remember(text, cache, key, image_hash, input_text, speech_text):
+    cache.set(key, text)
+    if image_hash is not None:
+        get_image_cache().store("gemini", image_hash, text, make_key(MODEL_NAME, input_text, speech_text))
+
+
+def _stream_and_cache(chunks, on_done):
+    parts = []
+    for text in chunks:
+        parts.append(text)
+        yield text
+    on_done("".join(parts))  # usage_metadata is complete once the stream is consumed
+
+
+# Convert Text to Speech (TTS)
+def text_to_speech(response_text, lang="en"):
+    # Each response gets its own cached file, so sessions never overwrite each other
+    return get_tts_cache().get_audio_path(response_text, lang)
@@ -0,0 +1,84 @@
+"""
+Shared image preparation for Gemini and DeepFace.
+
+Uploads are decoded once, rotated according to their EXIF orientation, scaled
+down so the longest edge is at most IMAGE_MAX_EDGE and re-encoded as compact
+JPEG (or WebP). The decoded pixels are exposed as NumPy arrays that are built
+once and shared by every consumer.
+"""
+
+import io
+import os
+import time
+from functools import cached_property, lru_cache
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from imageResultCache import image_hash
+from usageAccounting import estimate_image_tokens
+
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", 1024))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG")
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 85))
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+class PreparedImage:
+    def __init__(self, image, data, fmt, original_bytes, prep_time_ms):
+        self.image = image
+        self.data = data
+        self.mime_type = _MIME_TYPES[fmt]
+        self.original_bytes = original_bytes
+        self.prep_time_ms = prep_time_ms
+
+    @cached_property
+    def rgb(self):
+        """HxWx3 uint8 array in RGB order, decoded once."""
+        return np.asarray(self.image)
+
+    @cached_property
+    def bgr(self):
+        """Contiguous BGR copy for OpenCV/DeepFace, built once on first use."""
+        return np.ascontiguousarray(self.rgb[:, :, ::-1])
+
+    @cached_property
+    def perceptual_hash(self):
+        """64-bit perceptual hash used to find near-duplicate uploads."""
+        return image_hash(self.image)
+
+    @property
+    def token_estimate(self):
+        """Approximate Gemini input tokens for this image."""
+        return estimate_image_tokens(self.image.width, self.image.height)
+
+    def gemini_part(self):
+        """Inline blob for generate_content, so the SDK does not re-encode the image."""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+    def stats(self):
+        return {
+            "original_bytes": self.original_bytes,
+            "prepared_bytes": len(self.data),
+            "bytes_saved": self.original_bytes - len(self.data),
+            "size": f"{self.image.width}x{self.image.height}",
+            "prep_time_ms": self.prep_time_ms,
+            "token_estimate": self.token_estimate,
+        }
+
+
+@lru_cache(maxsize=8)
+def prepare_image(data, max_edge=IMAGE_MAX_EDGE, fmt=IMAGE_FORMAT, quality=IMAGE_QUALITY):
+    """Decode, orient, downscale and re-encode raw upload bytes."""
+    start = time.perf_counter()
+    fmt = fmt.upper()
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=quality, optimize=True)
+    prep_time_ms = round((time.perf_counter() - start) * 1000, 1)
+    return PreparedImage(image, buffer.getvalue(), fmt, len(data), prep_time_ms)
@@ -0,0 +1,142 @@
+"""
+Near-duplicate image result cache.
+
+Images are keyed by a 64-bit perceptual hash (pHash by default, dHash optional),
+so re-saved or recompressed copies of an upload map to nearby hashes. Each
+consumer (e.g. "deepface", "gemini") has its own Hamming-distance threshold for
+reuse, and results are further scoped by a context key such as the prompt.
+Storage is bounded and the least recently used entries are evicted first.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from itertools import count
+
+import numpy as np
+from PIL import Image
+
+import metricsRegistry
+
+IMAGE_HASH = os.getenv("IMAGE_HASH", "phash")
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", 2000))
+# Maximum Hamming distance (out of 64 bits) at which a cached result is reused
+DEFAULT_THRESHOLDS = {
+    "deepface": int(os.getenv("IMAGE_CACHE_DEEPFACE_DISTANCE", 8)),
+    "gemini": int(os.getenv("IMAGE_CACHE_GEMINI_DISTANCE", 4)),
+}
+
+
+def _bits_to_int(bits):
+    return int("".join("1" if b else "0" for b in bits.flatten()), 2)
+
+
+def dhash(image, size=8):
+    gray = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+_DCT_32 = np.array([[np.cos(np.pi * (2 * x + 1) * u / 64) for x in range(32)] for u in range(32)])
+
+
+def phash(image):
+    gray = image.convert("L").resize((32, 32), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float64)
+    dct = _DCT_32 @ pixels @ _DCT_32.T
+    low = dct[:8, :8]
+    # Compare against the median of the low frequencies, skipping the DC term
+    return _bits_to_int(low > np.median(low.flatten()[1:]))
+
+
+def image_hash(image, method=IMAGE_HASH):
+    return dhash(image) if method == "dhash" else phash(image)
+
+
+class HammingIndex:
+    """Hashes for one (consumer, context) group, searched with a vectorized popcount."""
+
+    def __init__(self):
+        self.ids = []
+        self.hashes = []
+        self._array = None
+
+    def add(self, entry_id, value):
+        self.ids.append(entry_id)
+        self.hashes.append(value)
+        self._array = None
+
+    def remove(self, entry_id):
+        i = self.ids.index(entry_id)
+        del self.ids[i], self.hashes[i]
+        self._array = None
+
+    def nearest(self, value):
+        if not self.ids:
+            return None, None
+        if self._array is None:
+            self._array = np.array(self.hashes, dtype=np.uint64)
+        xor = np.bitwise_xor(self._array, np.uint64(value))
+        distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        i = int(distances.argmin())
+        return self.ids[i], int(distances[i])
+
+
+class ImageResultCache:
+    def __init__(self, max_entries=IMAGE_CACHE_MAX_ENTRIES, thresholds=None):
+        self.max_entries = max_entries
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # id -> (group, value); order = LRU
+        self._groups = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+
+    def lookup(self, consumer, hash_value, context=""):
+        group = (consumer, context)
+        with self._lock:
+            index = self._groups.get(group)
+            entry_id, distance = index.nearest(hash_value) if index else (None, None)
+            if entry_id is None or distance > self.thresholds.get(consumer, 0):
+                self.misses += 1
+                metricsRegistry.inc("cache_requests_total", cache=f"image_{consumer}", result="miss")
+                return None
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            metricsRegistry.inc("cache_requests_total", cache=f"image_{consumer}", result="hit")
+            return self._entries[entry_id][1]
+
+    def store(self, consumer, hash_value, value, context=""):
+        group = (consumer, context)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (group, value)
+            self._groups.setdefault(group, HammingIndex()).add(entry_id, hash_value)
+            while len(self._entries) > self.max_entries:
+                old_id, (old_group, _) = self._entries.popitem(last=False)
+                index = self._groups[old_group]
+                index.remove(old_id)
+                if not index.ids:
+                    del self._groups[old_group]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "image_cache_hits": self.hits,
+            "image_cache_misses": self.misses,
+            "image_cache_hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "image_cache_entries": len(self._entries),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ImageResultCache()
+        return _cache
@@ -0,0 +1,126 @@
+"""
+Run the app as several Streamlit worker processes sharing one model server.
+
+    python launch.py --workers 4 --base-port 8501
+
+Starts modelServer.py, waits until it answers a health check, then starts one
+`streamlit run app.py` per worker on consecutive ports. Every worker gets
+MODEL_SERVER_ADDRESS (so emotion, TTS and semantic-cache calls go to the shared
+server) and METRICS_SHARED_DB (so the Live Metrics page can show all workers).
+The server and workers authenticate with a MODEL_SERVER_AUTHKEY generated for
+this run unless one is already set in the environment.
+Dead or unhealthy processes are restarted; Ctrl-C stops everything. Put a load
+balancer with sticky sessions (Streamlit keeps per-session state in a worker)
+in front of the worker ports.
+"""
+
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import time
+import urllib.request
+
+from modelServer import DEFAULT_ADDRESS, get_model_server
+
+HEALTH_INTERVAL_SEC = 5
+STARTUP_TIMEOUT_SEC = 120
+
+
+def model_server_healthy(address):
+    try:
+        return get_model_server(address).call("health", timeout=5)["status"] == "ok"
+    except Exception:
+        return False
+
+
+def worker_healthy(port):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=5) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+def start_model_server(address, env):
+    process = subprocess.Popen([sys.executable, "modelServer.py", "--address", address], env=env)
+    deadline = time.time() + STARTUP_TIMEOUT_SEC
+    while not model_server_healthy(address):
+        if process.poll() is not None or time.time() > deadline:
+            raise RuntimeError(f"model server failed to start on {address}")
+        time.sleep(0.5)
+    print(f"launch: model server ready on {address} (pid {process.pid})")
+    return process
+
+
+def start_worker(port, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py",
+         "--server.port", str(port), "--server.headless", "true"],
+        env=env,
+    )
+    print(f"launch: worker on port {port} (pid {process.pid})")
+    return process
+
+
+def stop(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start the model server and N Streamlit workers.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", 2)))
+    parser.add_argument("--base-port", type=int, default=8501)
+    parser.add_argument("--model-server", default=os.getenv("MODEL_SERVER_BIND", DEFAULT_ADDRESS))
+    parser.add_argument("--metrics-db", default=os.getenv("METRICS_SHARED_DB", "metrics_shared.sqlite3"))
+    args = parser.parse_args()
+
+    # Set in this process too, so its own health checks can connect
+    os.environ.setdefault("MODEL_SERVER_AUTHKEY", secrets.token_hex(32))
+    env = dict(os.environ, METRICS_SHARED_DB=os.path.abspath(args.metrics_db))
+    env.pop("METRICS_PORT", None)  # the model server does not serve /metrics; workers get their own ports
+    worker_env = dict(env, MODEL_SERVER_ADDRESS=args.model_server)
+    metrics_port = os.getenv("METRICS_PORT")
+
+    def env_for(port):
+        # With METRICS_PORT set, each worker serves /metrics on its own port (METRICS_PORT + worker index)
+        if metrics_port:
+            return dict(worker_env, METRICS_PORT=str(int(metrics_port) + port - args.base_port))
+        return worker_env
+
+    server = start_model_server(args.model_server, env)
+    ports = [args.base_port + i for i in range(args.workers)]
+    workers = {port: start_worker(port, env_for(port)) for port in ports}
+    # Workers get a grace period to boot before health checks count against them
+    booted_at = {port: time.time() for port in ports}
+
+    try:
+        while True:
+            time.sleep(HEALTH_INTERVAL_SEC)
+            if server.poll() is not None or not model_server_healthy(args.model_server):
+                print("launch: model server unhealthy, restarting")
+                stop(server)
+                server = start_model_server(args.model_server, env)
+            for port, process in workers.items():
+                booting = time.time() - booted_at[port] < STARTUP_TIMEOUT_SEC
+                if process.poll() is not None or (not booting and not worker_healthy(port)):
+                    print(f"launch: worker on port {port} unhealthy, restarting")
+                    stop(process)
+                    workers[port] = start_worker(port, env_for(port))
+                    booted_at[port] = time.time()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in workers.values():
+            stop(process)
+        stop(server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Deferred imports for heavy dependencies.
+
+Importing DeepFace (and with it TensorFlow), speech_recognition or
+google.generativeai costs seconds at Streamlit startup and on every page switch
+that pulls them in. A module-level
+
+    DeepFace = lazy_import("deepface", "DeepFace")
+
+binds a placeholder instead; the real import happens on first attribute access
+and is recorded in the import_seconds histogram. Run importProfile.py to see
+what each page still imports eagerly.
+"""
+
+import importlib
+import threading
+import time
+
+import metricsRegistry
+
+_lock = threading.Lock()
+
+
+class LazyModule:
+    def __init__(self, name, attribute=None):
+        self._name = name
+        self._attribute = attribute
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            with _lock:
+                if self._target is None:
+                    start = time.perf_counter()
+                    target = importlib.import_module(self._name)
+                    if self._attribute:
+                        target = getattr(target, self._attribute)
+                    metricsRegistry.observe("import_seconds", time.perf_counter() - start, module=self._name)
+                    self._target = target
+        return self._target
+
+    @property
+    def loaded(self):
+        return self._target is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        name = f"{self._name}.{self._attribute}" if self._attribute else self._name
+        return f"<lazy {name} ({state})>"
+
+
+def lazy_import(name, attribute=None):
+    """Placeholder for `import name` (or `from name import attribute`) that loads on first use."""
+    return LazyModule(name, attribute)
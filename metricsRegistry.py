@@ -0,0 +1,302 @@
+"""
+In-process metrics registry.
+
+Histograms use fixed, log-spaced buckets, so memory stays bounded however many
+observations are recorded, and p50/p95/p99 are estimated from the buckets.
+Counters track totals such as cache hits. Everything can be rendered in the
+Prometheus text format, written to a file, or served over HTTP, and the
+Streamlit page pages/metrics.py shows the same data.
+
+When several worker processes run side by side (see launch.py), each one
+periodically publishes a snapshot to the SQLite file named by
+METRICS_SHARED_DB; aggregate() merges the bucket counts and counters of every
+live process into one registry.
+"""
+
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# 1 ms .. ~160 s, four buckets per doubling
+DEFAULT_BUCKETS = tuple(round(0.001 * 2 ** (i / 4), 6) for i in range(70))
+THROUGHPUT_WINDOW_MIN = 60
+METRICS_SHARED_DB = os.getenv("METRICS_SHARED_DB")
+METRICS_PUBLISH_SEC = float(os.getenv("METRICS_PUBLISH_SEC", 5))
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Histogram:
+    def __init__(self, name, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.per_minute = deque(maxlen=THROUGHPUT_WINDOW_MIN)  # [minute, count] pairs
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        minute = int(time.time() // 60)
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            if self.per_minute and self.per_minute[-1][0] == minute:
+                self.per_minute[-1][1] += 1
+            else:
+                self.per_minute.append([minute, 1])
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for i, c in enumerate(self.counts):
+                if seen + c >= rank and c:
+                    lower = self.buckets[i - 1] if i > 0 else 0.0
+                    upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                    return lower + (upper - lower) * (rank - seen) / c
+                seen += c
+            return self.buckets[-1]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 4) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    def snapshot(self):
+        with self._lock:
+            return {"name": self.name, "labels": self.labels, "counts": list(self.counts),
+                    "count": self.count, "sum": self.sum, "per_minute": [list(p) for p in self.per_minute]}
+
+    def merge(self, data):
+        with self._lock:
+            self.counts = [a + b for a, b in zip(self.counts, data["counts"])]
+            self.count += data["count"]
+            self.sum += data["sum"]
+            minutes = dict((m, c) for m, c in self.per_minute)
+            for m, c in data["per_minute"]:
+                minutes[m] = minutes.get(m, 0) + c
+            self.per_minute.clear()
+            self.per_minute.extend([m, c] for m, c in sorted(minutes.items())[-THROUGHPUT_WINDOW_MIN:])
+
+    def render(self):
+        lines = []
+        cumulative = 0
+        for bound, c in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += c
+            labels = dict(self.labels, le=bound)
+            lines.append(f"{self.name}_bucket{_label_text(labels)} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_text(self.labels)} {self.sum}")
+        lines.append(f"{self.name}_count{_label_text(self.labels)} {self.count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self):
+        return [f"{self.name}{_label_text(self.labels)} {self.value}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.started = time.time()
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, store, cls, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = store.get(key)
+        if metric is None:
+            with self._lock:
+                metric = store.setdefault(key, cls(name, labels))
+        return metric
+
+    def histogram(self, name, **labels):
+        return self._get(self.histograms, Histogram, name, labels)
+
+    def counter(self, name, **labels):
+        return self._get(self.counters, Counter, name, labels)
+
+    def render_prometheus(self):
+        lines = []
+        for kind, store in (("histogram", self.histograms), ("counter", self.counters)):
+            for name in sorted({key[0] for key in store}):
+                lines.append(f"# TYPE {name} {kind}")
+                for key, metric in sorted(store.items(), key=lambda kv: kv[0]):
+                    if key[0] == name:
+                        lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {
+            "started": self.started,
+            "histograms": [h.snapshot() for h in list(self.histograms.values())],
+            "counters": [{"name": c.name, "labels": c.labels, "value": c.value}
+                         for c in list(self.counters.values())],
+        }
+
+    def merge(self, data):
+        self.started = min(self.started, data["started"])
+        for h in data["histograms"]:
+            self.histogram(h["name"], **h["labels"]).merge(h)
+        for c in data["counters"]:
+            self.counter(c["name"], **c["labels"]).inc(c["value"])
+
+    def write_prometheus_file(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+registry = MetricsRegistry()
+
+
+def observe(name, value, **labels):
+    registry.histogram(name, **labels).observe(value)
+
+
+def inc(name, amount=1, **labels):
+    registry.counter(name, **labels).inc(amount)
+
+
+def hit_rates(name="cache_requests_total", source=None):
+    """Hit rate per cache from counters labelled cache=<name>, result=hit|miss."""
+    totals = {}
+    for (metric_name, _), counter in (source or registry).counters.items():
+        if metric_name == name:
+            cache = counter.labels.get("cache")
+            hits, total = totals.get(cache, (0, 0))
+            if counter.labels.get("result") == "hit":
+                hits += counter.value
+            totals[cache] = (hits, total + counter.value)
+    return {cache: round(hits / total, 3) if total else 0.0 for cache, (hits, total) in totals.items()}
+
+
+_server = None
+_server_error = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port=int(os.getenv("METRICS_PORT", 9464))):
+    """
+    Serve /metrics in Prometheus format from a daemon thread (once per process).
+    Returns None if the port could not be bound; that is reported once, not retried.
+    """
+    global _server, _server_error
+    with _server_lock:
+        if _server is not None or _server_error is not None:
+            return _server
+        try:
+            _server = _make_server(port)
+        except OSError as e:  # e.g. the port is taken by another process
+            _server_error = e
+            print(f"metricsRegistry: not serving /metrics on port {port}: {e}")
+            return None
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
+
+
+def _make_server(port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return HTTPServer(("127.0.0.1", port), Handler)
+
+
+class SharedMetricsStore:
+    """One row per process holding its latest registry snapshot."""
+
+    def __init__(self, path=METRICS_SHARED_DB):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots (pid INTEGER PRIMARY KEY, updated REAL, data TEXT)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def publish(self, source=registry):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (pid, updated, data) VALUES (?, ?, ?)",
+                (os.getpid(), time.time(), json.dumps(source.snapshot())),
+            )
+
+    def aggregate(self, max_age_sec=None):
+        """Registry merged from every process that published within max_age_sec."""
+        max_age_sec = max_age_sec or METRICS_PUBLISH_SEC * 6
+        merged = MetricsRegistry()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM snapshots WHERE updated >= ?", (time.time() - max_age_sec,)
+            ).fetchall()
+        for (data,) in rows:
+            merged.merge(json.loads(data))
+        return merged, len(rows)
+
+
+_publisher = None
+
+
+def start_publisher(path=METRICS_SHARED_DB, interval=METRICS_PUBLISH_SEC):
+    """Publish this process's snapshot every interval seconds from a daemon thread."""
+    global _publisher
+    if _publisher is not None or not path:
+        return _publisher
+    _publisher = SharedMetricsStore(path)
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                _publisher.publish()
+            except sqlite3.Error:
+                pass  # another process holds the lock; the next round will catch up
+
+    threading.Thread(target=loop, daemon=True, name="metrics-publisher").start()
+    return _publisher
+
+
+if METRICS_SHARED_DB:
+    start_publisher()
@@ -0,0 +1,50 @@
+"""
+Shared Gemini client and model registry.
+
+Streamlit re-executes page scripts on every interaction, so anything built at
+module level in a page is rebuilt each time. The client and model objects here
+are cached once per process with st.cache_resource, and chat objects are kept
+per session in st.session_state so conversation context survives reruns.
+"""
+
+import os
+
+import streamlit as st
+from dotenv import load_dotenv
+
+from lazyImport import lazy_import
+
+genai = lazy_import("google.generativeai")
+
+load_dotenv()
+
+DEFAULT_MODEL = "models/gemini-2.5-flash"
+
+
+@st.cache_resource
+def configure_client():
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai
+
+
+@st.cache_resource
+def get_model(model_name=DEFAULT_MODEL):
+    configure_client()
+    return genai.GenerativeModel(model_name)
+
+
+def get_chat(session_key="chat", model_name=DEFAULT_MODEL, history=None):
+    """Return this session's chat object, creating it on first use."""
+    if session_key not in st.session_state:
+        st.session_state[session_key] = get_model(model_name).start_chat(history=history or [])
+    return st.session_state[session_key]
+
+
+@st.cache_resource
+def warm_up(model_names=(DEFAULT_MODEL,), ping=False):
+    """Build models up front; with ping=True also open the API connection."""
+    for name in model_names:
+        get_model(name)
+        if ping:
+            genai.get_model(name)
+    return True
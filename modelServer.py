@@ -0,0 +1,248 @@
+"""
+Local model server for multi-process deployments.
+
+Heavy inference (text emotion, DeepFace, TTS, semantic-cache embeddings) runs
+in this one process, so any number of Streamlit workers share a single copy of
+the model weights and caches. Workers talk to it over a local socket using
+multiprocessing.connection (TCP "host:port" or a Unix socket path).
+
+Set MODEL_SERVER_ADDRESS in a worker's environment to route calls here; see
+launch.py, which starts the server and the workers together. Requests are
+pickled, so anyone who can connect could run code in this process: the server
+and its workers must share a secret MODEL_SERVER_AUTHKEY, and the server will
+not start without one (launch.py generates a fresh key on every run).
+
+    MODEL_SERVER_AUTHKEY=<secret> python modelServer.py --address 127.0.0.1:6100
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+DEFAULT_ADDRESS = "127.0.0.1:6100"
+CALL_TIMEOUT_SEC = float(os.getenv("MODEL_SERVER_TIMEOUT", 120))
+
+
+def remote_address():
+    """Address of the model server when this process should use it, else None."""
+    return os.environ.get("MODEL_SERVER_ADDRESS") or None
+
+
+def authkey():
+    """The shared secret from MODEL_SERVER_AUTHKEY; there is deliberately no default."""
+    key = os.environ.get("MODEL_SERVER_AUTHKEY")
+    if not key:
+        raise RuntimeError("MODEL_SERVER_AUTHKEY is not set (launch.py generates one for the server and workers)")
+    return key.encode("utf-8")
+
+
+def parse_address(address):
+    if ":" in address and not address.startswith("/"):
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+    return address
+
+
+# ------------------------------------------------------------------ client side
+
+class ModelServerClient:
+    """One connection per calling thread, reconnecting once if the server restarted."""
+
+    def __init__(self, address):
+        self.address = parse_address(address)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=authkey())
+            self._local.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _send(self, request):
+        # Only a failed connect or send is retried: the server never got the request
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send(request)
+                return conn
+            except OSError:
+                self._drop()
+                if attempt:
+                    raise
+
+    def call(self, method, *args, timeout=CALL_TIMEOUT_SEC):
+        conn = self._send((method, args))
+        try:
+            answered = conn.poll(timeout)
+            if answered:
+                status, payload = conn.recv()
+        except (EOFError, OSError):
+            self._drop()  # the server may have run the request already, so it is not resent
+            raise
+        if not answered:
+            self._drop()  # a late reply would desynchronize the connection
+            raise TimeoutError(f"model server did not answer {method} within {timeout}s")
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_model_server(address=None):
+    address = address or remote_address()
+    with _clients_lock:
+        if address not in _clients:
+            _clients[address] = ModelServerClient(address)
+        return _clients[address]
+
+
+class RemoteTTSCache:
+    """Drop-in for ttsCache.TTSCache; audio files land in the shared cache directory."""
+
+    def get_audio_path(self, text, lang="en"):
+        return get_model_server().call("tts", text, lang)
+
+    def stats(self):
+        return get_model_server().call("tts_stats")
+
+
+class RemoteSemanticCache:
+    """Drop-in for semanticCache.SemanticCache backed by the server's single index."""
+
+    def lookup(self, question):
+        return get_model_server().call("semantic_lookup", question)
+
+    def put(self, question, answer, latency_sec=0.0, ttl=None):
+        get_model_server().call("semantic_put", question, answer, latency_sec, ttl)
+
+    def stats(self):
+        return get_model_server().call("semantic_stats")
+
+
+# ------------------------------------------------------------------ server side
+
+_started = time.time()
+HANDLERS = {}
+
+
+def handler(name):
+    def register(func):
+        HANDLERS[name] = func
+        return func
+    return register
+
+
+@handler("health")
+def _health():
+    import emotionModels
+    from emotionBatcher import get_batcher
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "uptime_sec": round(time.time() - _started, 1),
+        "models": emotionModels.load_stats(),
+        "text_batching": get_batcher().stats(),
+    }
+
+
+@handler("text_emotion")
+def _text_emotion(text):
+    from emotionAnalysis import detect_text_emotion
+    return detect_text_emotion(text)
+
+
+@handler("face_emotions")
+def _face_emotions(image, image_hash=None):
+    from emotionAnalysis import detect_face_emotions
+    return detect_face_emotions(image, image_hash)
+
+
+@handler("tts")
+def _tts(text, lang="en"):
+    from ttsCache import get_tts_cache
+    return os.path.abspath(get_tts_cache().get_audio_path(text, lang))
+
+
+@handler("tts_stats")
+def _tts_stats():
+    from ttsCache import get_tts_cache
+    return get_tts_cache().stats()
+
+
+@handler("semantic_lookup")
+def _semantic_lookup(question):
+    from semanticCache import get_semantic_cache
+    return get_semantic_cache().lookup(question)
+
+
+@handler("semantic_put")
+def _semantic_put(question, answer, latency_sec=0.0, ttl=None):
+    from semanticCache import get_semantic_cache
+    get_semantic_cache().put(question, answer, latency_sec, ttl)
+
+
+@handler("semantic_stats")
+def _semantic_stats():
+    from semanticCache import get_semantic_cache
+    return get_semantic_cache().stats()
+
+
+@handler("metrics")
+def _metrics():
+    from metricsRegistry import registry
+    return registry.render_prometheus()
+
+
+def _serve_connection(conn):
+    with conn:
+        while True:
+            try:
+                method, args = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                conn.send(("ok", HANDLERS[method](*args)))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def serve(address=DEFAULT_ADDRESS):
+    try:
+        key = authkey()
+    except RuntimeError as e:
+        sys.exit(f"modelServer: refusing to start: {e}")
+    # This process does the work itself; never forward to another server
+    os.environ.pop("MODEL_SERVER_ADDRESS", None)
+
+    import emotionModels
+    emotionModels.warm_up_in_background()
+
+    listener = Listener(parse_address(address), authkey=key)
+    print(f"Model server listening on {address} (pid {os.getpid()})")
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:  # e.g. a client with the wrong authkey
+            print(f"modelServer: rejected connection: {e}")
+            continue
+        threading.Thread(target=_serve_connection, args=(conn,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve emotion, TTS and embedding models to Streamlit workers.")
+    parser.add_argument("--address", default=os.getenv("MODEL_SERVER_BIND", DEFAULT_ADDRESS),
+                        help="host:port or Unix socket path")
+    serve(parser.parse_args().address)
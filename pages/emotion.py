@@ -1,91 +1,100 @@
 import streamlit as st
-import google.generativeai as genai
-from transformers import pipeline
-import cv2
-import numpy as np
-from deepface import DeepFace
-
-# Set up Google Gemini API
-GOOGLE_API_KEY = 'YOUR_API_KEY'
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-1.5-flash-latest')
-
-# Load Emotion Detection Model
-text_emotion_classifier = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", return_all_scores=True)
-
-# Emotion Mapping for Responses
-emotion_responses = {
-    'joy': "I'm glad to hear you're happy! 😊",
-    'anger': "I sense you're upset. Let me know how I can help. 😡",
-    'sadness': "I'm here to listen. Sending virtual hugs. 💙",
-    'fear': "It's okay to feel scared. You're not alone. 🤗",
-    'surprise': "Wow, that sounds exciting! 🎉",
-    'neutral': "Got it! Let's continue our chat. 😌"
-}
-
-def detect_text_emotion(user_input):
-    emotion_scores = text_emotion_classifier(user_input)[0]
-    detected_emotion = max(emotion_scores, key=lambda x: x['score'])['label']
-    return detected_emotion
-
-def detect_image_emotion(image):
-    image_np = np.array(image)
-    try:
-        faces = DeepFace.analyze(image_np, actions=['emotion'], enforce_detection=False)
-        if not faces:
-            return "No emotion detected"
-        emotions = [face['dominant_emotion'] for face in faces]
-        unique_emotions = set(emotions)
-        if len(unique_emotions) == 1:
-            return f"Detected emotion: {emotions[0]}"
-        else:
-            return f"Detected emotions: {', '.join(unique_emotions)}"
-    except Exception as e:
-        return f"Error in detecting emotion: {str(e)}"
-
-def generate_response(user_input, emotion):
-    prompt = f"User is feeling {emotion}. Respond appropriately: {user_input}"
-    gemini_response = model.generate_content(prompt)
-    return gemini_response.text
+from emotionModels import load_stats, warm_up_in_background
+from emotionBatcher import get_batcher
+from emotionAnalysis import emotion_responses, detect_image_emotion, analyze_message
+from imagePrep import prepare_image
+from conversationStore import RESTORE_WINDOW, get_conversation_store, session_id
+from usageAccounting import SessionBudget
+from modelServer import get_model_server, remote_address
+
+# Emotion models are loaded once per process; start loading them in the background,
+# unless a shared model server holds them for every worker
+if not remote_address():
+    warm_up_in_background()
 
 # Streamlit UI
 st.title("Emotion-Aware AI Chatbot")
 st.write("Chat with me and I'll understand your emotions! 🧠")
 
-# Chat History
+# Token/cost budget shared by every page of this session
+budget = st.session_state.setdefault("usage_budget", SessionBudget())
+
+# Chat History, resumed from the conversation store (newest exchanges only) after a reload
+store = get_conversation_store()
+sid = session_id()
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    turns = store.recent(sid, "emotion", RESTORE_WINDOW * 2)
+    if turns and turns[0][0] != "You":
+        turns = turns[1:]
+    st.session_state.chat_history = [(you[1], bot[1]) for you, bot in zip(turns[0::2], turns[1::2])]
 
-# User Input
-user_input = st.text_input("You:", key="user_input")
-if user_input:
-    # Detect Text Emotion
-    detected_emotion = detect_text_emotion(user_input)
+# The chat area is filled after the image uploader is read, so a photo can join the analysis
+chat_area = st.container()
 
-    # Generate Emotion-Aware Response
-    gemini_response = generate_response(user_input, detected_emotion)
+# Image Upload
+uploaded_file = st.file_uploader("Upload an image to detect facial emotion", type=["jpg", "png", "jpeg"])
 
-    # Store chat history
-    st.session_state.chat_history.append((user_input, gemini_response))
+prepared = None
+if uploaded_file is not None:
+    prepared = prepare_image(uploaded_file.getvalue())
+    st.image(prepared.image, caption="Uploaded Image", use_column_width=True)
+    if st.button("Detect Emotion"):
+        image_emotion = detect_image_emotion(prepared.bgr, prepared.perceptual_hash)
+        st.write(f"🖼️ {image_emotion}")
+        st.caption(f"Image prep: {prepared.stats()}")
+
+with chat_area:
+    # User Input; a form submits each message once, so later reruns do not analyze or persist it again
+    with st.form("chat_form", clear_on_submit=True):
+        user_input = st.text_input("You:", key="user_input")
+        use_photo = prepared is not None and st.checkbox("Include facial emotion from the uploaded photo", value=True)
+        # Off by default: a wrong guess costs a second billed Gemini call
+        speculate = st.checkbox("Start the reply before emotion detection finishes", value=False)
+        submitted = st.form_submit_button("Send")
+    if submitted and user_input:
+        # Text emotion, face emotion and (speculatively) the Gemini reply run in parallel
+        analysis = analyze_message(
+            user_input,
+            prepared.bgr if use_photo else None,
+            speculate=speculate,
+            guess=st.session_state.get("last_emotion", "neutral"),
+            image_hash=prepared.perceptual_hash if use_photo else None,
+            budget=budget,
+        )
+        detected_emotion = analysis["emotion"]
+        gemini_response = analysis["response"]
+        st.session_state["last_emotion"] = detected_emotion
+
+        # Store chat history
+        st.session_state.chat_history.append((user_input, gemini_response))
+        store.append(sid, "emotion", "You", user_input)
+        store.append(sid, "emotion", "Bot", gemini_response)
 
     # Display Chat
     for user_msg, bot_msg in st.session_state.chat_history:
         st.write(f"**You:** {user_msg}")
         st.write(f"**Bot:** {bot_msg}")
 
-    # Display Emotion Response
-    st.write(f"🧠 Detected Emotion: {detected_emotion}")
-    st.write(f"🤖 Emotion-Aware Reply: {emotion_responses.get(detected_emotion, 'I am here to assist you.')}")
-
-# Image Upload
-uploaded_file = st.file_uploader("Upload an image to detect facial emotion", type=["jpg", "png", "jpeg"])
-
-if uploaded_file is not None:
-    st.image(uploaded_file, caption="Uploaded Image", use_column_width=True)
-    if st.button("Detect Emotion"):
-        image = cv2.imdecode(np.frombuffer(uploaded_file.read(), np.uint8), 1)
-        image_emotion = detect_image_emotion(image)
-        st.write(f"🖼️ {image_emotion}")
+    if submitted and user_input:
+        # Display Emotion Response
+        st.write(f"🧠 Detected Emotion: {detected_emotion}")
+        if analysis["face_emotions"]:
+            st.write(f"🖼️ Facial Emotion: {', '.join(sorted(set(analysis['face_emotions'])))}")
+        elif analysis["face_error"]:
+            st.warning(f"Error in detecting emotion: {analysis['face_error']}")
+        st.write(f"🤖 Emotion-Aware Reply: {emotion_responses.get(detected_emotion, 'I am here to assist you.')}")
+        st.caption(f"⏱ Stage timings (s): {analysis['timings']} · speculation: {analysis['speculation'] or 'off'}")
+        st.caption(f"🪙 Session usage: {budget.stats()}")
+
+with st.expander("Model load stats"):
+    if remote_address():
+        try:
+            health = get_model_server().call("health", timeout=5)
+            st.json({**health["models"], "text_batching": health["text_batching"]})
+        except Exception as e:
+            st.warning(f"Model server unavailable: {e}")
+    else:
+        st.json({**load_stats(), "text_batching": get_batcher().stats()})
 
 st.markdown(
     """
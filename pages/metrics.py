@@ -0,0 +1,82 @@
+import time
+from datetime import datetime
+
+import streamlit as st
+
+import metricsRegistry
+from requestControl import get_limiter
+
+st.set_page_config(page_title="Live Metrics", layout="wide")
+
+st.markdown("<h1 style='text-align: center;'>📈 LIVE METRICS</h1>", unsafe_allow_html=True)
+
+registry = metricsRegistry.registry
+scope = "in this process"
+if metricsRegistry.METRICS_SHARED_DB and st.toggle("All worker processes", value=True):
+    metricsRegistry.start_publisher().publish()  # include this process's latest numbers
+    registry, processes = metricsRegistry.SharedMetricsStore().aggregate()
+    scope = f"across {processes} processes"
+st.caption(f"Collected since {datetime.fromtimestamp(registry.started):%Y-%m-%d %H:%M:%S} {scope}")
+
+if st.button("💬 Image chatbot"):
+    st.switch_page("app.py")
+
+# ------------------------------------------------------------------ latency percentiles
+st.subheader("⏱ Latency (seconds)")
+rows = []
+for (name, _), hist in sorted(registry.histograms.items(), key=lambda kv: kv[0]):
+    summary = hist.summary()
+    rows.append({
+        "Metric": name,
+        "Labels": ", ".join(f"{k}={v}" for k, v in hist.labels.items()),
+        "Count": summary["count"],
+        "Mean": summary["mean"],
+        "p50": round(summary["p50"], 3) if summary["p50"] is not None else None,
+        "p95": round(summary["p95"], 3) if summary["p95"] is not None else None,
+        "p99": round(summary["p99"], 3) if summary["p99"] is not None else None,
+    })
+if rows:
+    st.dataframe(rows, use_container_width=True)
+else:
+    st.info("No requests recorded yet.")
+
+# ------------------------------------------------------------------ cache hit rates
+st.subheader("🗄 Cache Hit Rates")
+rates = metricsRegistry.hit_rates(source=registry)
+if rates:
+    cols = st.columns(len(rates))
+    for col, (cache, rate) in zip(cols, sorted(rates.items())):
+        col.metric(f"{cache} cache", f"{rate * 100:.1f}%")
+else:
+    st.info("No cache lookups recorded yet.")
+
+# ------------------------------------------------------------------ throughput
+st.subheader("🚀 Throughput (requests per minute)")
+now_minute = int(time.time() // 60)
+minutes = range(now_minute - metricsRegistry.THROUGHPUT_WINDOW_MIN + 1, now_minute + 1)
+series = {}
+for (name, _), hist in registry.histograms.items():
+    if name != "request_latency_seconds":
+        continue
+    counts = dict((m, c) for m, c in list(hist.per_minute))
+    series[hist.labels.get("app", name)] = [counts.get(m, 0) for m in minutes]
+if series:
+    chart = [dict({"minute": datetime.fromtimestamp(m * 60).strftime("%H:%M")},
+                  **{app: values[i] for app, values in series.items()})
+             for i, m in enumerate(minutes)]
+    st.bar_chart(chart, x="minute")
+else:
+    st.info("No requests recorded yet.")
+
+# ------------------------------------------------------------------ admission control
+st.subheader("🚦 Gemini Admission Control (this process)")
+st.json(get_limiter().stats())
+
+# ------------------------------------------------------------------ prometheus export
+with st.expander("Prometheus text format"):
+    text = registry.render_prometheus()
+    st.download_button("Download metrics.prom", text, file_name="metrics.prom")
+    st.code(text, language="text")
+
+if st.button("🔄 Refresh"):
+    st.rerun()
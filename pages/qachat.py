@@ -7,13 +7,26 @@ load_dotenv()  ## loading all the environment variables
 
 import streamlit as st
 import os
-import google.generativeai as genai
+from modelRegistry import get_chat, get_model
+from chatMemory import ConversationMemory, SUMMARY_MODEL
+from conversationStore import get_conversation_store, session_id
+from geminiClient import get_client
+from semanticCache import get_semantic_cache
+import usageAccounting
 st.set_page_config(page_title="Q&A Demo")
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
-## function to load Gemini Pro model and get repsonses
-model = genai.GenerativeModel("models/gemini-2.5-flash")
-chat = model.start_chat(history=[])
+# Bounded conversation memory, resumed from the conversation store after a reload
+if 'chat_memory' not in st.session_state:
+    st.session_state['chat_memory'] = ConversationMemory.restore(
+        get_model(SUMMARY_MODEL), get_conversation_store(), session_id(), "qachat"
+    )
+memory = st.session_state['chat_memory']
+HISTORY_PAGE_SIZE = 10
+
+## Gemini model is shared per process; the chat object lives in session state so context survives reruns
+MODEL_NAME = "models/gemini-2.5-flash"
+chat = get_chat("qachat_chat", MODEL_NAME, history=memory.context_history())
+budget = st.session_state.setdefault("usage_budget", usageAccounting.SessionBudget())
 
 st.markdown(
     """
@@ -69,10 +82,27 @@ if st.button("💬 Image chatbot"):
 
 from performanceLogger import log_performance
 
-def get_gemini_response(question):
+def get_gemini_response(question, use_semantic_cache=False):
     def send_message(q):
-        response = chat.send_message(q, stream=True)
-        return "".join([chunk.text for chunk in response])
+        # Only the rolling summary and the recent turns within the token budget are resent;
+        # the session budget shrinks that window as it runs out
+        history = memory.context_history(budget.history_tokens(q, memory.max_tokens))
+        # The semantic cache is shared by every session, so only answers that depend on
+        # no private conversation context may be read from or written to it
+        shared_cache = use_semantic_cache and not history
+        if shared_cache:
+            cached = get_semantic_cache().lookup(q)
+            if cached is not None:
+                return cached
+        start = time.perf_counter()
+        chat.history = history
+        response = get_client().send_message(chat, q, stream=True)
+        full_response = "".join([chunk.text for chunk in response])
+        prompt_text = " ".join(part for turn in history for part in turn["parts"]) + " " + q
+        usageAccounting.record(MODEL_NAME, response, prompt_text, full_response, budget=budget)
+        if shared_cache:
+            get_semantic_cache().put(q, full_response, time.perf_counter() - start)
+        return full_response
 
     full_response, metrics = log_performance("Q&A Chatbot (Streaming)", question, send_message)
     return full_response, metrics
@@ -80,31 +110,37 @@ def get_gemini_response(question):
 
 #st.header("Gemini LLM Application")
 st.markdown("<h1 class='title-container'>  Q&A CHATBOT</h1>", unsafe_allow_html=True)
-# Initialize session state for chat history if it doesn't exist
-if 'chat_history' not in st.session_state:
-    st.session_state['chat_history'] = []
-
 input_text = st.text_input("Input: ", key="input")
+use_semantic_cache = st.checkbox("Answer paraphrased questions from the semantic cache", value=False)
 submit = st.button("Ask the question")
 
 
 if submit and input_text:
-    response, metrics = get_gemini_response(input_text)
-    st.session_state['chat_history'].append(("You", input_text))
+    response, metrics = get_gemini_response(input_text, use_semantic_cache)
+    memory.add("You", input_text)
     st.subheader("The Response is")
     st.write(response)
 
-    st.session_state['chat_history'].append(("Bot", response))
+    memory.add("Bot", response)
 
     # ------------------- DISPLAY PERFORMANCE METRICS -------------------
     st.markdown("### ⚙️ Performance Metrics")
     st.metric("Latency (seconds)", metrics["Latency (s)"])
     st.metric("Memory Change (MB)", metrics["Memory Change (MB)"])
     st.metric("CPU Usage (%)", metrics["CPU Usage (%)"])
+    st.caption(f"🪙 Session usage: {budget.stats()}")
+    if use_semantic_cache:
+        st.caption(f"Semantic cache: {get_semantic_cache().stats()}")
 
 st.subheader("The Chat History is")
-for role, text in st.session_state['chat_history']:
+# Only one page of turns is rendered per rerun, however long the session gets
+pages = memory.page_count(HISTORY_PAGE_SIZE)
+page = st.number_input("History page (1 = newest)", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+for role, text in memory.page(page - 1, HISTORY_PAGE_SIZE):
     st.write(f"{role}: {text}")
+if memory.summary:
+    with st.expander("Summary of earlier conversation"):
+        st.write(memory.summary)
 
 
 st.markdown(
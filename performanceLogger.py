@@ -1,40 +1,268 @@
-import psutil
+"""
+Low-overhead performance instrumentation.
+
+Wrap work in a span (context manager) or decorate it with @instrument. Timing uses
+time.perf_counter, CPU is this process's own CPU time (time.process_time), and
+memory is the RSS change of this process. Finished records are queued for a
+background writer that batches them into the configured sink, so the request
+path never blocks on file I/O.
+
+Sink is chosen with PERF_LOG_SINK (csv, jsonl or sqlite) and PERF_LOG_FILE.
+CSV and JSONL files are rotated once they exceed PERF_LOG_MAX_MB.
+
+Code running inside a span can attach fields to it with annotate() (e.g. token
+counts from usageAccounting) without being handed the span object.
+"""
+
+import atexit
+import contextvars
+import csv
+import functools
+import json
 import os
+import queue
+import sqlite3
+import threading
 import time
-import csv
 from datetime import datetime
 
-LOG_FILE = "performance_log.csv"
+import psutil
+
+import metricsRegistry
+
+LOG_SINK = os.getenv("PERF_LOG_SINK", "csv")
+LOG_FILE = os.getenv("PERF_LOG_FILE", {"csv": "performance_log.csv",
+                                       "jsonl": "performance_log.jsonl",
+                                       "sqlite": "performance_log.sqlite3"}.get(LOG_SINK, "performance_log.csv"))
+LOG_MAX_MB = float(os.getenv("PERF_LOG_MAX_MB", 10))
+LOG_BACKUPS = int(os.getenv("PERF_LOG_BACKUPS", 3))
+FLUSH_INTERVAL_SEC = 2.0
+
+FIELDS = ["Timestamp", "App", "Query", "Latency (s)", "CPU Time (s)", "CPU Usage (%)", "Memory Change (MB)"]
+
+_process = psutil.Process(os.getpid())
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _rss_mb():
+    return _process.memory_info().rss / (1024 * 1024)
+
+
+# ------------------------------------------------------------------ sinks
+
+class _RotatingFileSink:
+    def __init__(self, path, max_mb=LOG_MAX_MB, backups=LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.backups = backups
+
+    def _rotate(self):
+        if not os.path.isfile(self.path) or os.path.getsize(self.path) < self.max_bytes:
+            return
+        self._shift()
+
+    def _shift(self):
+        """Move the current file to .1 (and older backups up by one)."""
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def write(self, records):
+        self._rotate()
+        new_file = not os.path.isfile(self.path)
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            self._write(f, records, new_file)
+
+
+class CSVSink(_RotatingFileSink):
+    HEADER = FIELDS + ["Extra"]
+
+    def __init__(self, path, max_mb=LOG_MAX_MB, backups=LOG_BACKUPS):
+        super().__init__(path, max_mb, backups)
+        self._header_checked = False
+
+    def _rotate(self):
+        # A file written with an older column layout is moved aside instead of appended to
+        if not self._header_checked:
+            if os.path.isfile(self.path) and self._existing_header() != self.HEADER:
+                self._shift()
+            self._header_checked = True
+        super()._rotate()
+
+    def _existing_header(self):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), None)
+
+    def _write(self, f, records, new_file):
+        # Extra fields attached to a span are kept in the CSV as a trailing JSON column
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(self.HEADER)
+        for r in records:
+            extra = {k: v for k, v in r.items() if k not in FIELDS}
+            writer.writerow([r.get(k) for k in FIELDS] + [json.dumps(extra) if extra else ""])
+
+
+class JSONLSink(_RotatingFileSink):
+    def _write(self, f, records, new_file):
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+class SQLiteSink:
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+
+    def write(self, records):
+        if self._conn is None:
+            # Created on the writer thread, which is the only thread that uses it
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS performance (timestamp TEXT, app TEXT, record TEXT)")
+        self._conn.executemany(
+            "INSERT INTO performance VALUES (?, ?, ?)",
+            [(r["Timestamp"], r["App"], json.dumps(r, ensure_ascii=False)) for r in records],
+        )
+        self._conn.commit()
+
+
+def make_sink(kind=LOG_SINK, path=LOG_FILE):
+    return {"csv": CSVSink, "jsonl": JSONLSink, "sqlite": SQLiteSink}[kind](path)
+
+
+# ------------------------------------------------------------------ writer
+
+class BufferedWriter:
+    """Collects records on a queue and flushes them from a daemon thread."""
+
+    def __init__(self, sink, flush_interval=FLUSH_INTERVAL_SEC):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        self._queue.put(record)
+
+    def _drain(self):
+        records = []
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        records = self._drain()
+        if records:
+            try:
+                self.sink.write(records)
+            except Exception as e:
+                print(f"performanceLogger: failed to write {len(records)} records: {e}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BufferedWriter(make_sink())
+            atexit.register(_writer.flush)
+        return _writer
+
+
+def set_sink(sink):
+    """Send all further records to sink (any object with write(records))."""
+    get_writer().sink = sink
+
+
+# ------------------------------------------------------------------ spans
+
+class span:
+    """
+    Time a block of work and log it:
+
+        with span("Image Chat", query) as s:
+            ...
+            s.fields["cache_hit"] = True
+        s.metrics  # {"Latency (s)": ..., "CPU Usage (%)": ..., "Memory Change (MB)": ...}
+    """
+
+    def __init__(self, app_name, query="", log=True, **fields):
+        self.app_name = app_name
+        self.query = query
+        self.log = log
+        self.fields = fields
+        self.metrics = {}
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self._mem_before = _rss_mb()
+        self._cpu_before = time.process_time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        latency = time.perf_counter() - self._start
+        cpu_time = time.process_time() - self._cpu_before
+        _current_span.reset(self._token)
+        self.metrics = {
+            "Latency (s)": round(latency, 3),
+            "CPU Time (s)": round(cpu_time, 3),
+            "CPU Usage (%)": round(cpu_time / latency * 100, 2) if latency > 0 else 0.0,
+            "Memory Change (MB)": round(_rss_mb() - self._mem_before, 2),
+        }
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        metricsRegistry.observe("request_latency_seconds", latency, app=self.app_name)
+        if self.log:
+            record = {"Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                      "App": self.app_name, "Query": self.query}
+            record.update(self.metrics)
+            record.update(self.fields)
+            get_writer().emit(record)
+        return False
+
+
+def annotate(**fields):
+    """Add fields to the innermost active span; numbers add up across calls in the same span."""
+    current = _current_span.get()
+    if current is None:
+        return
+    for name, value in fields.items():
+        previous = current.fields.get(name)
+        if isinstance(value, (int, float)) and isinstance(previous, (int, float)):
+            value = previous + value
+        current.fields[name] = value
+
+
+def instrument(app_name, **fields):
+    """Decorator form of span; the first positional argument is logged as the query."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            query = args[0] if args and isinstance(args[0], str) else ""
+            with span(app_name, query, **fields):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
 
 def log_performance(app_name: str, query: str, func):
     """
     Logs latency, CPU, and memory usage for a given function call.
     """
-    process = psutil.Process(os.getpid())
-    mem_before = process.memory_info().rss / (1024 * 1024)
-    cpu_before = psutil.cpu_percent(interval=None)
-    start_time = time.time()
-
-    # Execute the provided function
-    response = func(query)
-
-    end_time = time.time()
-    mem_after = process.memory_info().rss / (1024 * 1024)
-    cpu_after = psutil.cpu_percent(interval=None)
-
-    latency = round(end_time - start_time, 3)
-    mem_change = round(mem_after - mem_before, 2)
-    cpu_usage = round(abs(cpu_after - cpu_before), 2)
-
-    # Log to CSV
-    header = ["Timestamp", "App", "Query", "Latency (s)", "Memory Change (MB)", "CPU Usage (%)"]
-    row = [datetime.now().strftime("%Y-%m-%d %H:%M:%S"), app_name, query, latency, mem_change, cpu_usage]
-
-    file_exists = os.path.isfile(LOG_FILE)
-    with open(LOG_FILE, "a", newline="") as csvfile:
-        writer = csv.writer(csvfile)
-        if not file_exists:
-            writer.writerow(header)
-        writer.writerow(row)
-
-    return response, {"Latency (s)": latency, "Memory Change (MB)": mem_change, "CPU Usage (%)": cpu_usage}
+    with span(app_name, query) as s:
+        response = func(query)
+    return response, s.metrics
@@ -0,0 +1,238 @@
+"""
+Admission control for Gemini requests from the image chat.
+
+* SingleFlight coalesces identical concurrent requests: the first caller for a
+  key makes the upstream call and everyone else waiting on the same key gets
+  its result (or, for streams, a replay of the same chunks).
+* AdaptiveLimiter caps how many calls are in flight. The cap follows AIMD: it
+  grows by about one per round of successful calls, and is cut multiplicatively
+  when a call fails with a retryable error or takes much longer than the
+  observed no-load latency. That baseline is tracked per kind of call: a
+  stream holds its slot only until the first chunk, so its latency is not
+  comparable with a full answer's. Callers over the cap wait in per-session
+  queues that are served round-robin, so one busy session cannot starve the
+  others.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import metricsRegistry
+from geminiClient import retryable_errors
+
+LIMITER_INITIAL = float(os.getenv("LIMITER_INITIAL", 4))
+LIMITER_MIN = float(os.getenv("LIMITER_MIN", 1))
+LIMITER_MAX = float(os.getenv("LIMITER_MAX", 32))
+LIMITER_BACKOFF = float(os.getenv("LIMITER_BACKOFF", 0.7))
+# A call slower than this multiple of the baseline latency counts as congestion
+LIMITER_LATENCY_TOLERANCE = float(os.getenv("LIMITER_LATENCY_TOLERANCE", 2.5))
+LIMITER_QUEUE_TIMEOUT_SEC = float(os.getenv("LIMITER_QUEUE_TIMEOUT_SEC", 60))
+
+
+# ------------------------------------------------------------------ coalescing
+
+class SharedStream:
+    """Text chunks from one upstream stream, replayable by any number of readers."""
+
+    def __init__(self):
+        self.chunks = []
+        self.response = None
+        self.error = None
+        self.done = False
+        self._cond = threading.Condition()
+
+    def feed(self, text):
+        with self._cond:
+            self.chunks.append(text)
+            self._cond.notify_all()
+
+    def finish(self, response=None, error=None):
+        with self._cond:
+            self.response = response
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self.chunks) and not self.done:
+                    self._cond.wait()
+                if i >= len(self.chunks):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                text = self.chunks[i]
+            i += 1
+            yield text
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key, make):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                metricsRegistry.inc("coalesced_requests_total", result="shared")
+                return flight, False
+            flight = self._flights[key] = make()
+        metricsRegistry.inc("coalesced_requests_total", result="leader")
+        return flight, True
+
+    def _forget(self, key):
+        with self._lock:
+            self._flights.pop(key, None)
+
+    def call(self, key, func):
+        """(result, leader) where only the leader actually ran func."""
+        future, leader = self._join(key, Future)
+        if leader:
+            try:
+                future.set_result(func())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._forget(key)
+        return future.result(), leader
+
+    def stream(self, key, func):
+        """
+        (SharedStream, leader). func returns an iterator of chunks with .text; the leader's
+        call is drained on a background thread so readers can come and go independently.
+        """
+        shared, leader = self._join(key, SharedStream)
+        if leader:
+            threading.Thread(target=self._pump, args=(key, func, shared), daemon=True).start()
+        return shared, leader
+
+    def _pump(self, key, func, shared):
+        response = None
+        try:
+            response = func()
+            for chunk in response:
+                shared.feed(chunk.text)
+        except Exception as e:
+            shared.finish(response, e)
+        else:
+            shared.finish(response)
+        finally:
+            self._forget(key)
+
+
+# ------------------------------------------------------------------ adaptive limiter
+
+class AdaptiveLimiter:
+    def __init__(self, initial=LIMITER_INITIAL, minimum=LIMITER_MIN, maximum=LIMITER_MAX,
+                 backoff=LIMITER_BACKOFF, tolerance=LIMITER_LATENCY_TOLERANCE):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.inflight = 0
+        self.baselines = {}           # kind -> slowly rising minimum of observed latencies
+        self._last_decrease = 0.0
+        self._queues = OrderedDict()  # session -> deque of waiting events, in round-robin order
+        self._lock = threading.Lock()
+
+    def _admit_waiters(self):
+        # Hand free slots to the sessions in turn, one waiter each
+        while self._queues and self.inflight < int(self.limit):
+            session, waiters = next(iter(self._queues.items()))
+            event = waiters.popleft()
+            if waiters:
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            self.inflight += 1
+            event.set()
+
+    def acquire(self, session="default", timeout=LIMITER_QUEUE_TIMEOUT_SEC):
+        start = time.perf_counter()
+        with self._lock:
+            if not self._queues and self.inflight < int(self.limit):
+                self.inflight += 1
+                return
+            event = threading.Event()
+            self._queues.setdefault(session, deque()).append(event)
+        if not event.wait(timeout):
+            with self._lock:
+                if not event.is_set():
+                    waiters = self._queues.get(session)
+                    waiters.remove(event)
+                    if not waiters:
+                        del self._queues[session]
+                    metricsRegistry.inc("limiter_rejected_total")
+                    raise TimeoutError(f"no Gemini slot free within {timeout}s")
+        metricsRegistry.observe("limiter_queue_wait_seconds", time.perf_counter() - start)
+
+    def release(self, latency, congested, kind="call"):
+        """kind groups calls with comparable latency, e.g. "stream" (time to first chunk) and "call"."""
+        now = time.monotonic()
+        with self._lock:
+            self.inflight -= 1
+            baseline = self.baselines.get(kind)
+            if not congested:  # failed calls say nothing about no-load latency
+                if baseline is None or latency < baseline:
+                    baseline = latency
+                else:
+                    baseline += (latency - baseline) * 0.01
+                self.baselines[kind] = baseline
+            slow = baseline is not None and latency > baseline * self.tolerance
+            if congested or slow:
+                # At most one cut per baseline interval, so one burst of failures is not over-counted
+                if now - self._last_decrease > (baseline or 0):
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._admit_waiters()
+
+    def slot(self, session="default", kind="call"):
+        return _Slot(self, session, kind)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "inflight": self.inflight,
+                "queued": sum(len(w) for w in self._queues.values()),
+                "queued_sessions": len(self._queues),
+                "baseline_latency_sec": {kind: round(value, 3) for kind, value in self.baselines.items()},
+            }
+
+
+class _Slot:
+    def __init__(self, limiter, session, kind):
+        self.limiter = limiter
+        self.session = session
+        self.kind = kind
+
+    def __enter__(self):
+        self.limiter.acquire(self.session)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        congested = exc_type is not None and issubclass(exc_type, retryable_errors() + (TimeoutError,))
+        self.limiter.release(time.perf_counter() - self._start, congested, self.kind)
+        return False
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveLimiter()
+        return _limiter
@@ -0,0 +1,122 @@
+"""
+Persistent cache for Gemini responses.
+
+Entries are keyed by model name, normalized prompt text, recognized speech and a
+hash of the image bytes. They live in a SQLite file so hits survive restarts and
+can be shared by several Streamlit workers on the same host.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import metricsRegistry
+
+CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "response_cache.sqlite3")
+CACHE_TTL_SEC = int(os.getenv("RESPONSE_CACHE_TTL", 24 * 60 * 60))
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000))
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different prompts share a key."""
+    return " ".join((text or "").split())
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest() if data else ""
+
+
+def make_key(model_name, prompt, speech_text="", image_bytes=None):
+    payload = json.dumps(
+        [model_name, normalize_text(prompt), normalize_text(speech_text), hash_bytes(image_bytes)]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed key/value store with TTL expiry and LRU eviction."""
+
+    def __init__(self, path=CACHE_DB, ttl=CACHE_TTL_SEC, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                metricsRegistry.inc("cache_requests_total", cache="response", result="miss")
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            metricsRegistry.inc("cache_requests_total", cache="response", result="hit")
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "cache_entries": size,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide cache; module state survives Streamlit reruns."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,173 @@
+"""
+Semantic response cache for paraphrased questions.
+
+Questions are embedded with a small local sentence-transformer (the same
+all-MiniLM-L6-v2 model AccuracyEval uses) and compared against earlier
+questions with a vectorized cosine-similarity search over a NumPy matrix, or a
+FAISS inner-product index when faiss is installed and SEMANTIC_CACHE_FAISS=1.
+Answers above SEMANTIC_CACHE_THRESHOLD are returned without calling Gemini.
+Entries carry their own TTL and the index is saved to disk in the background.
+
+The cache is shared by every session (and every worker, behind the model
+server), so callers must only store answers that do not depend on a private
+conversation: the Q&A page uses it only for questions asked without history.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metricsRegistry
+
+SEMANTIC_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR", "semantic_cache")
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.9))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", 7 * 24 * 60 * 60))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 5000))
+USE_FAISS = os.getenv("SEMANTIC_CACHE_FAISS") == "1"
+
+
+class SemanticCache:
+    def __init__(self, path=SEMANTIC_CACHE_DIR, model_name=SEMANTIC_CACHE_MODEL,
+                 threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES, embedder=None):
+        self.path = path
+        self.model_name = model_name
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._embedder = embedder
+        self._lock = threading.Lock()
+        self._saver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="semantic-cache")
+        self._faiss_index = None
+
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved_sec = 0.0
+        self.lookup_sec = 0.0
+
+        self.entries = []   # {"question", "answer", "expires", "latency"}
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self._load()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from sentence_transformers import SentenceTransformer
+            self._embedder = SentenceTransformer(self.model_name)
+        return self._embedder
+
+    def _embed(self, text):
+        vector = self.embedder.encode([text], convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vector, dtype=np.float32)[0]
+
+    # ------------------------------------------------------------------ persistence
+
+    def _load(self):
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        entries_path = os.path.join(self.path, "entries.json")
+        if not (os.path.isfile(vectors_path) and os.path.isfile(entries_path)):
+            return
+        with open(entries_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name:
+            return  # vectors from another embedding model are not comparable
+        self.entries = meta["entries"]
+        self.vectors = np.load(vectors_path)
+        self._drop_expired(time.time())
+
+    def _save(self, entries, vectors):
+        os.makedirs(self.path, exist_ok=True)
+        np.save(os.path.join(self.path, "vectors.tmp.npy"), vectors)
+        with open(os.path.join(self.path, "entries.tmp.json"), "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "entries": entries}, f, ensure_ascii=False)
+        os.replace(os.path.join(self.path, "vectors.tmp.npy"), os.path.join(self.path, "vectors.npy"))
+        os.replace(os.path.join(self.path, "entries.tmp.json"), os.path.join(self.path, "entries.json"))
+
+    # ------------------------------------------------------------------ index
+
+    def _drop_expired(self, now):
+        keep = [i for i, e in enumerate(self.entries) if e["expires"] > now]
+        if len(keep) != len(self.entries):
+            self.entries = [self.entries[i] for i in keep]
+            self.vectors = self.vectors[keep]
+            self._faiss_index = None
+
+    def _search(self, vector):
+        if USE_FAISS:
+            import faiss
+            if self._faiss_index is None:
+                self._faiss_index = faiss.IndexFlatIP(self.vectors.shape[1])
+                self._faiss_index.add(self.vectors)
+            scores, ids = self._faiss_index.search(vector[None, :], 1)
+            return int(ids[0][0]), float(scores[0][0])
+        scores = self.vectors @ vector  # rows are unit vectors, so this is cosine similarity
+        i = int(scores.argmax())
+        return i, float(scores[i])
+
+    # ------------------------------------------------------------------ API
+
+    def lookup(self, question):
+        """Cached answer for a semantically similar question, or None."""
+        start = time.perf_counter()
+        vector = self._embed(question)
+        with self._lock:
+            self._drop_expired(time.time())
+            match = self._search(vector) if self.entries else None
+            self.lookup_sec += time.perf_counter() - start
+            if match is None or match[1] < self.threshold:
+                self.misses += 1
+                metricsRegistry.inc("cache_requests_total", cache="semantic", result="miss")
+                return None
+            entry = self.entries[match[0]]
+            self.hits += 1
+            self.latency_saved_sec += entry["latency"]
+            metricsRegistry.inc("cache_requests_total", cache="semantic", result="hit")
+            return entry["answer"]
+
+    def put(self, question, answer, latency_sec=0.0, ttl=None):
+        vector = self._embed(question)
+        with self._lock:
+            self.entries.append({
+                "question": question,
+                "answer": answer,
+                "expires": time.time() + (ttl or self.ttl),
+                "latency": round(latency_sec, 3),
+            })
+            self.vectors = vector[None, :] if not len(self.vectors) else np.vstack([self.vectors, vector])
+            if len(self.entries) > self.max_entries:
+                self.entries = self.entries[-self.max_entries:]
+                self.vectors = self.vectors[-self.max_entries:]
+            self._faiss_index = None
+            snapshot = (list(self.entries), self.vectors.copy())
+        self._saver.submit(self._save, *snapshot)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "semantic_hits": self.hits,
+            "semantic_misses": self.misses,
+            "semantic_hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "latency_saved_sec": round(self.latency_saved_sec, 2),
+            "avg_lookup_ms": round(self.lookup_sec / lookups * 1000, 1) if lookups else 0.0,
+            "entries": len(self.entries),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    global _cache
+    from modelServer import RemoteSemanticCache, remote_address
+    if remote_address():
+        return RemoteSemanticCache()
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache()
+        return _cache
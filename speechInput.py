@@ -0,0 +1,178 @@
+"""
+Background speech capture and transcription.
+
+A TranscriptionJob records from the microphone (or reads an uploaded audio
+file) and transcribes it on its own thread, publishing partial transcripts as
+they arrive, so the Streamlit script thread never blocks on listening or on the
+recognizer. Engines are pluggable:
+
+* google  - speech_recognition's free Google Web Speech API (remote)
+* vosk    - offline Kaldi models (VOSK_MODEL_PATH), streams partial results
+* whisper - offline faster-whisper on CPU (WHISPER_MODEL, int8), streams segments
+
+Recognizers and models are created once per process and reused.
+"""
+
+import io
+import json
+import os
+import threading
+import time
+
+import metricsRegistry
+from lazyImport import lazy_import
+
+sr = lazy_import("speech_recognition")
+
+SPEECH_ENGINE = os.getenv("SPEECH_ENGINE", "google")
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "vosk-model-small-en-us-0.15")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")
+SAMPLE_RATE = 16000
+
+
+class GoogleEngine:
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+
+    def transcribe(self, audio, on_partial):
+        return self.recognizer.recognize_google(audio)
+
+
+class VoskEngine:
+    def __init__(self):
+        from vosk import Model
+        self.model = Model(VOSK_MODEL_PATH)
+
+    def transcribe(self, audio, on_partial):
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(self.model, SAMPLE_RATE)
+        raw = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2)
+        done = []
+        for i in range(0, len(raw), 8000):  # quarter-second chunks
+            if recognizer.AcceptWaveform(raw[i:i + 8000]):
+                done.append(json.loads(recognizer.Result())["text"])
+                on_partial(" ".join(done))
+            else:
+                on_partial(" ".join(done + [json.loads(recognizer.PartialResult())["partial"]]))
+        done.append(json.loads(recognizer.FinalResult())["text"])
+        text = " ".join(t for t in done if t)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class WhisperEngine:
+    def __init__(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(WHISPER_MODEL, device="cpu", compute_type="int8")
+
+    def transcribe(self, audio, on_partial):
+        import numpy as np
+        raw = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2)
+        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self.model.transcribe(samples, language="en", beam_size=1, vad_filter=True)
+        parts = []
+        for segment in segments:
+            parts.append(segment.text.strip())
+            on_partial(" ".join(parts))
+        if not parts:
+            raise sr.UnknownValueError()
+        return " ".join(parts)
+
+
+_recognizer = None
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_recognizer():
+    global _recognizer
+    with _engines_lock:
+        if _recognizer is None:
+            _recognizer = sr.Recognizer()
+        return _recognizer
+
+
+def get_engine(name=SPEECH_ENGINE):
+    recognizer = get_recognizer()
+    with _engines_lock:
+        if name not in _engines:
+            if name == "google":
+                _engines[name] = GoogleEngine(recognizer)
+            elif name == "vosk":
+                _engines[name] = VoskEngine()
+            elif name == "whisper":
+                _engines[name] = WhisperEngine()
+            else:
+                raise ValueError(f"Unknown speech engine: {name}")
+        return _engines[name]
+
+
+def load_audio_file(data, filename=""):
+    """AudioData from uploaded bytes; wav/flac/aiff directly, anything else through pydub."""
+    if not filename.lower().endswith((".wav", ".flac", ".aif", ".aiff")):
+        from pydub import AudioSegment
+        wav = io.BytesIO()
+        AudioSegment.from_file(io.BytesIO(data)).export(wav, format="wav")
+        data = wav.getvalue()
+    with sr.AudioFile(io.BytesIO(data)) as source:
+        return get_recognizer().record(source)
+
+
+class TranscriptionJob:
+    """
+    One capture + transcription on a background thread. The page keeps the job in
+    session state and reads status/partial/text on each rerun.
+    """
+
+    def __init__(self, engine=SPEECH_ENGINE, audio_bytes=None, filename=""):
+        self.engine = engine
+        self.status = "starting"   # listening -> transcribing -> done | error
+        self.partial = ""
+        self.text = ""
+        self.error = None
+        self.latency_sec = None
+        self._audio_bytes = audio_bytes
+        self._filename = filename
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self.status in ("starting", "listening", "transcribing")
+
+    def _set_partial(self, text):
+        self.partial = text
+
+    def _run(self):
+        try:
+            recognizer = get_recognizer()  # first use imports speech_recognition
+        except ImportError as e:
+            self.error = f"Speech recognition is not installed: {e}"
+            self.status = "error"
+            return
+        try:
+            engine = get_engine(self.engine)
+            if self._audio_bytes is not None:
+                audio = load_audio_file(self._audio_bytes, self._filename)
+            else:
+                self.status = "listening"
+                with sr.Microphone() as source:
+                    audio = recognizer.listen(source)
+
+            self.status = "transcribing"
+            start = time.perf_counter()
+            self.text = engine.transcribe(audio, self._set_partial)
+            self.latency_sec = round(time.perf_counter() - start, 2)
+            metricsRegistry.observe("transcription_seconds", self.latency_sec, engine=self.engine)
+            self.partial = self.text
+            self.status = "done"
+        except sr.UnknownValueError:
+            self.error = "Could not understand the audio."
+            self.status = "error"
+        except sr.RequestError:
+            self.error = "Speech recognition service error."
+            self.status = "error"
+        except Exception as e:
+            self.error = f"Speech recognition failed: {e}"
+            self.status = "error"
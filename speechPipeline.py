@@ -0,0 +1,123 @@
+"""
+Streams model tokens to the UI while synthesizing speech sentence by sentence.
+
+Completed sentences are handed to a background worker as soon as they appear in
+the token stream, so the first audio chunk is ready long before the model has
+finished generating.
+"""
+
+import queue
+import re
+import threading
+import time
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class SentenceSegmenter:
+    """Buffers streamed text and returns sentences once they are complete."""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text):
+        self._buffer += text
+        parts = SENTENCE_END.split(self._buffer)
+        self._buffer = parts.pop()
+        return [p.strip() for p in parts if p.strip()]
+
+    def flush(self):
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+class SentenceAudioWorker:
+    """Synthesizes queued sentences on a background thread via a TTSCache."""
+
+    def __init__(self, tts_cache, lang="en", on_first_audio=None):
+        self.tts_cache = tts_cache
+        self.lang = lang
+        self.on_first_audio = on_first_audio
+        self.audio_paths = []
+        self.errors = []
+        self._cancelled = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, sentence):
+        self._queue.put(sentence)
+
+    def _run(self):
+        while True:
+            sentence = self._queue.get()
+            if sentence is None or self._cancelled:
+                return
+            try:
+                self.audio_paths.append(self.tts_cache.get_audio_path(sentence, self.lang))
+                if len(self.audio_paths) == 1 and self.on_first_audio:
+                    self.on_first_audio()
+            except Exception as e:
+                self.errors.append(str(e))
+
+    def close(self):
+        """Wait for pending sentences and return the audio files in order."""
+        self._queue.put(None)
+        self._thread.join()
+        return self.audio_paths
+
+    def cancel(self):
+        """Stop after the sentence in progress, dropping the rest, without waiting."""
+        self._cancelled = True
+        self._queue.put(None)
+
+
+class StreamingPipeline:
+    def __init__(self, tts_cache, lang="en"):
+        self.start_time = time.perf_counter()
+        self.first_token_sec = None
+        self.first_audio_sec = None
+        self.segmenter = SentenceSegmenter()
+        self.worker = SentenceAudioWorker(tts_cache, lang, on_first_audio=self._mark_first_audio)
+
+    def _mark_first_audio(self):
+        self.first_audio_sec = time.perf_counter() - self.start_time
+
+    def run(self, chunks):
+        """Pass text chunks through unchanged (e.g. into st.write_stream) while feeding TTS."""
+        completed = False
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if self.first_token_sec is None:
+                    self.first_token_sec = time.perf_counter() - self.start_time
+                for sentence in self.segmenter.feed(chunk):
+                    self.worker.submit(sentence)
+                yield chunk
+            for sentence in self.segmenter.flush():
+                self.worker.submit(sentence)
+            completed = True
+        finally:
+            if not completed:
+                # The stream failed or was abandoned (e.g. a rerun), so finish_audio will not be called
+                self.worker.cancel()
+
+    def finish_audio(self):
+        """Join all sentence clips into one mp3 payload for st.audio."""
+        audio = b""
+        for path in self.worker.close():
+            with open(path, "rb") as f:
+                audio += f.read()
+        return audio or None
+
+    @property
+    def errors(self):
+        """TTS failures, one message per sentence that could not be synthesized."""
+        return self.worker.errors
+
+    def metrics(self):
+        return {
+            "time_to_first_token_sec": round(self.first_token_sec, 2) if self.first_token_sec is not None else None,
+            "time_to_first_audio_sec": round(self.first_audio_sec, 2) if self.first_audio_sec is not None else None,
+        }
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import AccuracyEval  # noqa: E402
+from benchmarks import fakeGenai  # noqa: E402
+
+DATASET = [
+    {"query": "capital of France?", "expected": "Paris"},
+    {"query": "2 + 2?", "expected": "4"},
+    {"query": "largest planet?", "expected": "Jupiter"},
+]
+
+
+def write_checkpoint(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, row in enumerate(rows):
+            record = {"Index": i, "Query": row["query"], "Expected": row["expected"], "Response": f"answer {i}"}
+            f.write(json.dumps(record) + "\n")
+
+
+def test_checkpoint_is_keyed_by_row_not_position(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    write_checkpoint(path, DATASET)
+    reordered = list(reversed(DATASET))
+    records = AccuracyEval.load_checkpoint(str(path), reordered)
+    for row in reordered:
+        record = records[AccuracyEval.row_key(row["query"], row["expected"])]
+        assert (record["Query"], record["Expected"]) == (row["query"], row["expected"])
+
+
+def test_records_from_another_dataset_are_skipped(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    write_checkpoint(path, DATASET)
+    other = [DATASET[1], {"query": "capital of France?", "expected": "Lyon"}]
+    records = AccuracyEval.load_checkpoint(str(path), other)
+    assert [r["Query"] for r in records.values()] == ["2 + 2?"]
+
+
+class CountingModel(fakeGenai.GenerativeModel):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        self.prompts.append(contents)
+        return super().generate_content(contents, stream=stream, **kwargs)
+
+
+def test_resume_only_queries_rows_missing_from_the_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setitem(fakeGenai.CONFIG, "latency", 0.0)
+    path = tmp_path / "checkpoint.jsonl"
+    write_checkpoint(path, DATASET[:2])
+    model = CountingModel()
+    dataset = [DATASET[2], DATASET[1], DATASET[0]]
+    records = AccuracyEval.run_queries(model, dataset, str(path), concurrency=2, rate=100, retries=0)
+    assert model.prompts == ["largest planet?"]
+    assert len(records) == 3
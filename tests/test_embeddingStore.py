@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from embeddingStore import EmbeddingStore, text_hash
+
+
+class FakeEmbedder:
+    """Deterministic 3-d embeddings, so rows can be checked against their text."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True):
+        self.encoded.extend(texts)
+        vectors = np.array([[len(t), ord(t[0]), 1.0] for t in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def expected(texts):
+    return FakeEmbedder().encode(texts)
+
+
+def open_store(tmp_path):
+    return EmbeddingStore("fake-model", root=str(tmp_path), embedder=FakeEmbedder())
+
+
+def test_only_unseen_texts_are_encoded(tmp_path):
+    store = open_store(tmp_path)
+    store.encode(["alpha", "beta"])
+    again = open_store(tmp_path)
+    vectors = again.encode(["beta", "gamma", "alpha"])
+    assert again.embedder.encoded == ["gamma"]
+    np.testing.assert_allclose(vectors, expected(["beta", "gamma", "alpha"]), rtol=1e-6)
+
+
+@pytest.mark.parametrize("leftover", [b"\x00" * 5, np.ones(3, dtype=np.float32).tobytes()])
+def test_unindexed_rows_are_truncated_on_load(tmp_path, leftover):
+    # A partial row, or a full row whose index write never happened
+    store = open_store(tmp_path)
+    store.encode(["alpha", "beta"])
+    with open(store.vectors_path, "ab") as f:
+        f.write(leftover)
+
+    reloaded = open_store(tmp_path)
+    assert reloaded._rows_on_disk() == 2
+    vectors = reloaded.encode(["gamma", "alpha"])
+    assert reloaded.index[text_hash("gamma")] == 2
+    np.testing.assert_allclose(vectors, expected(["gamma", "alpha"]), rtol=1e-6)
+
+
+def test_index_entries_past_the_end_are_dropped(tmp_path):
+    store = open_store(tmp_path)
+    store.encode(["alpha"])
+    with open(store.index_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["index"][text_hash("ghost")] = 7
+    with open(store.index_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    reloaded = open_store(tmp_path)
+    assert text_hash("ghost") not in reloaded.index
+    np.testing.assert_allclose(reloaded.encode(["ghost"]), expected(["ghost"]), rtol=1e-6)
+    assert reloaded.index[text_hash("ghost")] == 1
@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+import pytest
+
+import metricsRegistry
+from benchmarks import fakeGenai
+from geminiClient import GeminiClient
+
+RETRY_ON = (fakeGenai.FakeQuotaError, asyncio.TimeoutError)
+
+
+@pytest.fixture(autouse=True)
+def fast_backend():
+    saved = dict(fakeGenai.CONFIG)
+    fakeGenai.CONFIG.update(latency=0.01, first_chunk=0.01, chunk_interval=0.0, error_rate=0.0)
+    yield
+    fakeGenai.CONFIG.clear()
+    fakeGenai.CONFIG.update(saved)
+
+
+def make_client(**kwargs):
+    options = dict(rate=1000, burst=100, deadline=5, retries=3, hedge_after=None, base_delay=0.01,
+                   retry_on=RETRY_ON)
+    options.update(kwargs)
+    return GeminiClient(**options)
+
+
+class FlakyModel(fakeGenai.GenerativeModel):
+    """Answers with a 429 for the first `failures` calls."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.calls = 0
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise fakeGenai.FakeQuotaError("simulated quota exhaustion")
+        return super().generate_content(contents, stream=stream, **kwargs)
+
+
+class SlowFirstModel(fakeGenai.GenerativeModel):
+    """The first call stalls; any later call answers at the configured latency."""
+
+    def __init__(self, stall):
+        super().__init__()
+        self.stall = stall
+        self.calls = 0
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(self.stall)
+        return super().generate_content(contents, stream=stream, **kwargs)
+
+
+def test_retries_429_until_success():
+    model = FlakyModel(failures=2)
+    response = make_client().generate(model, "hello")
+    assert "hello" in response.text
+    assert model.calls == 3
+
+
+def test_gives_up_after_retries():
+    model = FlakyModel(failures=10)
+    with pytest.raises(fakeGenai.FakeQuotaError):
+        make_client(retries=2).generate(model, "hello")
+    assert model.calls == 3
+
+
+def test_streamed_429_before_first_chunk_is_retried():
+    model = FlakyModel(failures=1)
+    chunks = make_client().generate(model, "hello", stream=True)
+    assert "hello" in "".join(chunk.text for chunk in chunks)
+    assert model.calls == 2
+
+
+def test_deadline_covers_slow_call():
+    fakeGenai.CONFIG["latency"] = 2.0
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        make_client(deadline=0.2).generate(fakeGenai.GenerativeModel(), "hello")
+    assert time.perf_counter() - start < 1.0
+
+
+def test_hedged_call_wins_over_stalled_one():
+    hedged = metricsRegistry.registry.counter("gemini_hedged_requests_total")
+    before = hedged.value
+    model = SlowFirstModel(stall=2.0)
+    start = time.perf_counter()
+    response = make_client(hedge_after=0.1).generate(model, "hello")
+    assert "hello" in response.text
+    assert time.perf_counter() - start < 1.0
+    assert model.calls == 2
+    assert hedged.value == before + 1
+
+
+def test_send_message_is_never_hedged():
+    model = SlowFirstModel(stall=0.3)
+    chat = model.start_chat()
+    make_client(hedge_after=0.05).send_message(chat, "hello")
+    assert model.calls == 1
+    assert len(chat.history) == 2
+
+
+def test_stream_keeps_usage_metadata():
+    response = make_client().generate(fakeGenai.GenerativeModel(), "hello there", stream=True)
+    assert response.usage_metadata.candidates_token_count == 0  # not consumed yet
+    text = "".join(chunk.text for chunk in response)
+    assert response.usage_metadata.prompt_token_count == 2
+    assert response.usage_metadata.candidates_token_count == len(text.split())
+
+
+def test_deadline_covers_stalled_stream():
+    fakeGenai.CONFIG["chunk_interval"] = 2.0
+    client = make_client(deadline=0.3)
+    start = time.perf_counter()
+    response = client.generate(fakeGenai.GenerativeModel(), "hello", stream=True)
+    chunks = iter(response)
+    next(chunks)  # the primed first chunk
+    with pytest.raises(TimeoutError):
+        next(chunks)
+    assert time.perf_counter() - start < 1.0
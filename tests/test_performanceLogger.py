@@ -0,0 +1,35 @@
+import csv
+
+import pytest
+
+pytest.importorskip("psutil")
+
+from performanceLogger import CSVSink  # noqa: E402
+
+RECORD = {"Timestamp": "2024-01-01 00:00:00", "App": "Image Chat", "Query": "q", "Latency (s)": 1.0,
+          "CPU Time (s)": 0.1, "CPU Usage (%)": 10.0, "Memory Change (MB)": 0.0, "cost_usd": 0.001}
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_old_layout_is_moved_aside(tmp_path):
+    path = tmp_path / "performance_log.csv"
+    path.write_text("Timestamp,App,Query,Latency (s),CPU Usage (%),Memory Change (MB)\nold,row,,1,2,3\n")
+    CSVSink(str(path)).write([RECORD])
+    rows = read_rows(path)
+    assert rows[0] == CSVSink.HEADER
+    assert len(rows) == 2
+    assert read_rows(f"{path}.1")[1] == ["old", "row", "", "1", "2", "3"]
+
+
+def test_current_layout_is_appended_to(tmp_path):
+    path = tmp_path / "performance_log.csv"
+    CSVSink(str(path)).write([RECORD])
+    CSVSink(str(path)).write([RECORD])
+    rows = read_rows(path)
+    assert rows[0] == CSVSink.HEADER
+    assert len(rows) == 3
+    assert rows[1][-1] == '{"cost_usd": 0.001}'
@@ -0,0 +1,188 @@
+import threading
+import time
+
+import pytest
+
+from requestControl import AdaptiveLimiter, SingleFlight
+
+
+def release_many(limiter, latencies, congested=False):
+    for latency, kind in latencies:
+        limiter.acquire()
+        limiter.release(latency, congested, kind)
+
+
+# ------------------------------------------------------------------ AdaptiveLimiter
+
+def test_limit_grows_while_latency_is_steady():
+    limiter = AdaptiveLimiter(initial=4, maximum=32)
+    release_many(limiter, [(0.5, "call")] * 50)
+    assert limiter.limit > 8
+
+
+def test_mixed_stream_and_full_calls_do_not_shrink_the_limit():
+    # Streams release at the first chunk, full calls at the whole answer
+    limiter = AdaptiveLimiter(initial=8, maximum=32)
+    release_many(limiter, [(0.4, "stream"), (3.0, "call")] * 50)
+    assert limiter.limit >= 8
+    assert limiter.stats()["baseline_latency_sec"] == {"stream": 0.4, "call": 3.0}
+
+
+def test_slow_call_cuts_the_limit():
+    limiter = AdaptiveLimiter(initial=8, backoff=0.5)
+    release_many(limiter, [(0.4, "call")])
+    release_many(limiter, [(4.0, "call")])
+    assert limiter.limit == pytest.approx((8 + 1 / 8) * 0.5)
+
+
+def test_errors_cut_the_limit_but_not_the_baseline():
+    limiter = AdaptiveLimiter(initial=8, backoff=0.5)
+    release_many(limiter, [(0.4, "call")])
+    release_many(limiter, [(0.01, "call")], congested=True)
+    assert limiter.limit < 8
+    assert limiter.stats()["baseline_latency_sec"] == {"call": 0.4}
+
+
+def test_limit_stays_within_bounds():
+    limiter = AdaptiveLimiter(initial=2, minimum=1, maximum=3, backoff=0.1)
+    release_many(limiter, [(0.1, "call")] * 50)
+    assert limiter.limit == 3
+    release_many(limiter, [(0.1, "call")], congested=True)
+    assert limiter.limit == 1
+
+
+def test_queued_sessions_are_served_round_robin():
+    limiter = AdaptiveLimiter(initial=1, maximum=1)
+    limiter.acquire("busy")
+    order = []
+
+    def wait(session):
+        limiter.acquire(session)
+        order.append(session)
+
+    threads = []
+    for session in ["busy", "busy", "busy", "quiet"]:
+        thread = threading.Thread(target=wait, args=(session,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)  # queue them in this order
+    for _ in threads:
+        limiter.release(0.1, False)
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join(1)
+    assert order[:2] == ["busy", "quiet"]
+
+
+def test_acquire_times_out_when_saturated():
+    limiter = AdaptiveLimiter(initial=1, maximum=1)
+    limiter.acquire()
+    with pytest.raises(TimeoutError):
+        limiter.acquire("other", timeout=0.05)
+    assert limiter.stats()["queued"] == 0
+
+
+def test_slot_counts_timeouts_as_congestion():
+    limiter = AdaptiveLimiter(initial=8, backoff=0.5)
+    with pytest.raises(TimeoutError):
+        with limiter.slot("s"):
+            raise TimeoutError
+    assert limiter.limit == 4
+    assert limiter.inflight == 0
+
+
+# ------------------------------------------------------------------ SingleFlight
+
+def test_concurrent_calls_share_one_result():
+    flights = SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.call("k", work)))
+    leader.start()
+    started.wait(1)
+    follower = flights.call("k", work)
+    leader.join(1)
+    assert follower == ("answer", False)
+    assert results == [("answer", True)]
+    assert len(calls) == 1
+
+
+def test_call_after_the_flight_runs_again():
+    flights = SingleFlight()
+    assert flights.call("k", lambda: 1) == (1, True)
+    assert flights.call("k", lambda: 2) == (2, True)
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("upstream failed")
+
+    errors = []
+
+    def leader():
+        try:
+            flights.call("k", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    started.wait(1)
+    with pytest.raises(ValueError):
+        flights.call("k", fail)
+    thread.join(1)
+    assert len(errors) == 1
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+def test_stream_is_replayed_to_every_reader():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        yield Chunk("a")
+        release.wait(1)
+        yield Chunk("b")
+
+    first, leader = flights.stream("k", lambda: upstream())
+    second, follower = flights.stream("k", lambda: upstream())
+    release.set()
+    assert (leader, follower) == (True, False)
+    assert first is second
+    assert list(first) == ["a", "b"]
+    assert list(second) == ["a", "b"]
+    assert len(calls) == 1
+
+
+def test_stream_error_is_raised_after_the_chunks():
+    flights = SingleFlight()
+
+    def upstream():
+        yield Chunk("a")
+        raise ValueError("cut off")
+
+    shared, _ = flights.stream("k", lambda: upstream())
+    received = []
+    with pytest.raises(ValueError):
+        for text in shared:
+            received.append(text)
+    assert received == ["a"]
@@ -0,0 +1,57 @@
+import pytest
+
+from speechPipeline import StreamingPipeline
+
+
+class FakeTTS:
+    def __init__(self, clip=None, fail_on=()):
+        self.clip = clip
+        self.fail_on = fail_on
+        self.spoken = []
+
+    def get_audio_path(self, text, lang="en"):
+        if text in self.fail_on:
+            raise RuntimeError(f"cannot synthesize {text!r}")
+        self.spoken.append(text)
+        return self.clip
+
+
+def worker_stopped(pipeline):
+    pipeline.worker._thread.join(1)
+    return not pipeline.worker._thread.is_alive()
+
+
+def test_sentences_are_synthesized_in_order(tmp_path):
+    clip = tmp_path / "clip.mp3"
+    clip.write_bytes(b"x")
+    tts = FakeTTS(str(clip))
+    pipeline = StreamingPipeline(tts)
+    assert "".join(pipeline.run(["One. Tw", "o! Three"])) == "One. Two! Three"
+    assert pipeline.finish_audio() == b"xxx"
+    assert tts.spoken == ["One.", "Two!", "Three"]
+
+
+def test_failed_stream_stops_the_worker():
+    def chunks():
+        yield "One. "
+        raise TimeoutError("stalled")
+
+    pipeline = StreamingPipeline(FakeTTS())
+    with pytest.raises(TimeoutError):
+        list(pipeline.run(chunks()))
+    assert worker_stopped(pipeline)
+
+
+def test_abandoned_stream_stops_the_worker():
+    pipeline = StreamingPipeline(FakeTTS())
+    stream = pipeline.run(iter(["One. ", "Two. "]))
+    next(stream)
+    stream.close()
+    assert worker_stopped(pipeline)
+
+
+def test_tts_errors_are_reported():
+    pipeline = StreamingPipeline(FakeTTS(fail_on=("Two.",)))
+    list(pipeline.run(["One. Two. Three."]))
+    pipeline.worker.close()
+    assert pipeline.errors == ["cannot synthesize 'Two.'"]
@@ -0,0 +1,118 @@
+"""
+On-disk cache for text-to-speech audio.
+
+Each response is written to its own file named after a hash of the text and
+language, so repeated answers skip synthesis and concurrent sessions never
+overwrite each other's audio. The directory is bounded and the least recently
+used files are evicted first.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+import metricsRegistry
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_FILES = int(os.getenv("TTS_CACHE_MAX_FILES", 200))
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", 100))
+
+
+def gtts_synthesizer(text, lang, path):
+    """Default backend: synthesize with gTTS and save an mp3 to path."""
+    from gtts import gTTS
+    gTTS(text=text, lang=lang).save(path)
+
+
+class TTSCache:
+    def __init__(self, synthesizer=gtts_synthesizer, cache_dir=TTS_CACHE_DIR,
+                 max_files=TTS_CACHE_MAX_FILES, max_mb=TTS_CACHE_MAX_MB):
+        self.synthesizer = synthesizer
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, lang):
+        return hashlib.sha256(f"{lang}\n{text}".encode("utf-8")).hexdigest()
+
+    def path_for(self, text, lang="en"):
+        return os.path.join(self.cache_dir, f"{self.make_key(text, lang)}.mp3")
+
+    def get_audio_path(self, text, lang="en"):
+        """Return the path of a cached mp3 for text, synthesizing it on a miss."""
+        path = self.path_for(text, lang)
+        if os.path.exists(path):
+            self.hits += 1
+            metricsRegistry.inc("cache_requests_total", cache="tts", result="hit")
+            os.utime(path)  # bump for LRU eviction
+            return path
+
+        self.misses += 1
+        metricsRegistry.inc("cache_requests_total", cache="tts", result="miss")
+        # Write to a unique temp file, then rename, so readers never see partial audio.
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            start = time.perf_counter()
+            self.synthesizer(text, lang, tmp_path)
+            metricsRegistry.observe("tts_synthesis_seconds", time.perf_counter() - start)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._evict()
+        return path
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".mp3"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+            entries.sort(reverse=True)  # newest first
+
+            total = 0
+            for i, (_, size, name) in enumerate(entries):
+                total += size
+                if i >= self.max_files or (i > 0 and total > self.max_bytes):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except FileNotFoundError:
+                        pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "tts_hits": self.hits,
+            "tts_misses": self.misses,
+            "tts_hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache(synthesizer=None):
+    """Return the process-wide TTS cache, optionally swapping its backend."""
+    global _cache
+    from modelServer import RemoteTTSCache, remote_address
+    if remote_address():
+        return RemoteTTSCache()
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache()
+        if synthesizer is not None:
+            _cache.synthesizer = synthesizer
+        return _cache
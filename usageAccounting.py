@@ -0,0 +1,146 @@
+"""
+Token and cost accounting for Gemini calls, with per-session budgets.
+
+Every call site reports its response here. Prompt and completion token counts
+come from the response's usage_metadata when Gemini returns it, otherwise from
+a local estimate (~4 characters per text token, 258 tokens per 768px image
+tile). The counts, the image payload size and the resulting cost are added to
+the active performanceLogger span, so they land in the same record as the
+call's latency, and are exported as gemini_tokens_total / gemini_cost_usd_total.
+
+A SessionBudget caps what one Streamlit session may spend. As it fills up the
+pages resend less chat history and send smaller images, before the request
+goes out rather than failing it.
+"""
+
+import json
+import math
+import os
+import threading
+
+import metricsRegistry
+from performanceLogger import annotate
+
+# USD per million (input, output) tokens; override with GEMINI_PRICES='{"gemini-2.5-flash": [0.3, 2.5]}'
+PRICES_PER_MILLION = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-1.5-flash": (0.075, 0.30),
+}
+PRICES_PER_MILLION.update({k: tuple(v) for k, v in json.loads(os.getenv("GEMINI_PRICES", "{}")).items()})
+
+IMAGE_TILE_PX = 768
+IMAGE_TILE_TOKENS = 258
+
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", 200_000))      # 0 = unlimited
+SESSION_COST_BUDGET_USD = float(os.getenv("SESSION_COST_BUDGET_USD", 0))    # 0 = unlimited
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 8000))
+BUDGET_IMAGE_EDGE = int(os.getenv("BUDGET_IMAGE_EDGE", 512))
+# Share of the session budget after which history and images are cut back
+BUDGET_TIGHTEN_AT = float(os.getenv("BUDGET_TIGHTEN_AT", 0.8))
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting English text
+    return len(text) // 4 + 1
+
+
+def estimate_image_tokens(width, height):
+    return math.ceil(width / IMAGE_TILE_PX) * math.ceil(height / IMAGE_TILE_PX) * IMAGE_TILE_TOKENS
+
+
+def price(model_name):
+    """(input, output) USD per million tokens; unknown models cost 0."""
+    name = model_name.removeprefix("models/").removesuffix("-latest")
+    for known in sorted(PRICES_PER_MILLION, key=len, reverse=True):
+        if name.startswith(known):
+            return PRICES_PER_MILLION[known]
+    return (0.0, 0.0)
+
+
+def usage_from_response(response):
+    """(prompt_tokens, completion_tokens) reported by Gemini, or None."""
+    try:
+        usage = response.usage_metadata
+        prompt, completion = usage.prompt_token_count, usage.candidates_token_count
+    except AttributeError:  # not returned by this SDK version or backend
+        return None
+    return (prompt, completion) if prompt else None
+
+
+def record(model_name, response=None, prompt_text="", completion_text="", image_tokens=0, image_bytes=0,
+           budget=None):
+    """Account for one Gemini call; returns the usage fields it recorded."""
+    reported = usage_from_response(response) if response is not None else None
+    if reported:
+        prompt_tokens, completion_tokens = reported
+    else:
+        prompt_tokens = estimate_tokens(prompt_text) + image_tokens
+        completion_tokens = estimate_tokens(completion_text)
+    input_price, output_price = price(model_name)
+    cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "image_bytes": image_bytes,
+        "cost_usd": round(cost, 6),
+    }
+    model = model_name.removeprefix("models/")
+    metricsRegistry.inc("gemini_tokens_total", prompt_tokens, kind="prompt", model=model)
+    metricsRegistry.inc("gemini_tokens_total", completion_tokens, kind="completion", model=model)
+    metricsRegistry.inc("gemini_cost_usd_total", cost, model=model)
+    annotate(token_source="usage_metadata" if reported else "estimate", **usage)
+    if budget is not None:
+        budget.charge(usage)
+    return usage
+
+
+class SessionBudget:
+    def __init__(self, max_tokens=SESSION_TOKEN_BUDGET, max_cost_usd=SESSION_COST_BUDGET_USD,
+                 prompt_tokens=PROMPT_TOKEN_BUDGET, low_image_edge=BUDGET_IMAGE_EDGE):
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+        self.prompt_tokens = prompt_tokens
+        self.low_image_edge = low_image_edge
+        self.tokens_used = 0
+        self.cost_usd = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def charge(self, usage):
+        with self._lock:
+            self.tokens_used += usage["prompt_tokens"] + usage["completion_tokens"]
+            self.cost_usd += usage["cost_usd"]
+            self.calls += 1
+
+    def used_fraction(self):
+        fractions = [0.0]
+        if self.max_tokens:
+            fractions.append(self.tokens_used / self.max_tokens)
+        if self.max_cost_usd:
+            fractions.append(self.cost_usd / self.max_cost_usd)
+        return max(fractions)
+
+    def history_tokens(self, question, default):
+        """Tokens of chat history to resend with question."""
+        allowed = min(default, self.prompt_tokens - estimate_tokens(question))
+        if self.used_fraction() >= BUDGET_TIGHTEN_AT:
+            allowed //= 4  # near the session budget only a short recent window is resent
+        return max(0, allowed)
+
+    def image_edge(self, default):
+        """Longest image edge to send, so image tokens stay within half the prompt budget."""
+        if self.used_fraction() >= BUDGET_TIGHTEN_AT:
+            return min(default, self.low_image_edge)
+        edge = default
+        while edge > self.low_image_edge and estimate_image_tokens(edge, edge) > self.prompt_tokens // 2:
+            edge //= 2
+        return max(edge, min(default, self.low_image_edge))
+
+    def stats(self):
+        return {
+            "session_tokens": self.tokens_used,
+            "session_cost_usd": round(self.cost_usd, 4),
+            "session_calls": self.calls,
+            "budget_used": round(self.used_fraction(), 3),
+        }